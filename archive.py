@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+import time
+from urllib.parse import quote
+import config
+from db import add_ingest_listener, fetch_observations_between, to_utc_datetime
+
+# pyarrow is optional and imported by the functions that use it, so importing
+# this module (and main) does not load it while the archive is disabled
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+logger = logging.getLogger(__name__)
+
+# Columnar archive of WeatherData: one Parquet file per city and UTC day under
+# ARCHIVE_DIR/city=<city>/date=<YYYY-MM-DD>/data.parquet (hive layout). Readers
+# get column-pruned, partition- and row-filtered slices without going through EdgeDB.
+
+VALUE_COLUMNS = [
+    "temperature", "feels_like", "temp_min", "temp_max", "pressure", "humidity",
+    "wind_speed", "wind_deg", "rainfall", "predicted_rain_chance", "latitude", "longitude"
+]
+TEMPERATURE_COLUMNS = ("temperature", "feels_like", "temp_min", "temp_max")
+
+_write_lock = threading.Lock()
+_pending = []  # rows stored since the last flush
+
+
+def _require_pyarrow():
+    if not HAVE_PYARROW:
+        raise RuntimeError("The Parquet archive needs the 'pyarrow' package")
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema(
+        [("timestamp", pa.timestamp("us", tz="UTC"))] + [(name, pa.float64()) for name in VALUE_COLUMNS]
+    )
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([("city", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+def _partition_path(root: str, city: str, day: str) -> str:
+    return os.path.join(root, f"city={quote(city, safe='')}", f"date={day}", "data.parquet")
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def write_rows(rows, root: str = None) -> int:
+    """
+    Merge observations into their city/day partitions. Only the partitions the
+    rows fall into are rewritten; a repeated (city, timestamp) replaces the
+    archived row, matching the upsert in EdgeDB. Returns the number of rows written.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    root = root or config.ARCHIVE_DIR
+
+    partitions = {}  # (city, day) -> {timestamp: row}
+    for row in rows:
+        if not row.get("city") or row.get("timestamp") is None:
+            continue
+        ts = to_utc_datetime(row["timestamp"])
+        partitions.setdefault((row["city"], ts.date().isoformat()), {})[ts] = row
+
+    schema = _schema()
+    written = 0
+    with _write_lock:
+        for (city, day), by_timestamp in partitions.items():
+            new = pa.Table.from_pydict(
+                dict(
+                    {"timestamp": list(by_timestamp)},
+                    **{name: [_number(row.get(name)) for row in by_timestamp.values()] for name in VALUE_COLUMNS}
+                ),
+                schema=schema
+            )
+            path = _partition_path(root, city, day)
+            if os.path.exists(path):
+                old = pq.read_table(path, schema=schema)
+                keep = pc.invert(pc.is_in(old["timestamp"], value_set=new["timestamp"]))
+                new = pa.concat_tables([old.filter(keep), new])
+            new = new.sort_by("timestamp")
+
+            # Write next to the partition file and rename, so readers never see a partial file
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The dot prefix keeps dataset discovery from picking up the in-progress file
+            tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+            pq.write_table(new, tmp_path)
+            os.replace(tmp_path, path)
+            written += len(by_timestamp)
+    return written
+
+
+def _dataset(root: str):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs
+    if not os.path.isdir(root):
+        return None
+    # Memory-map the Parquet files instead of reading them into buffers
+    filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+    return ds.dataset(root, schema=_schema().append(pa.field("city", pa.string())).append(pa.field("date", pa.string())),
+                      format="parquet", partitioning=_partitioning(), filesystem=filesystem)
+
+
+def read_observations(columns=None, cities=None, since=None, until=None, root: str = None):
+    """
+    Return archived observations as a DataFrame, limited to `columns` (all, plus
+    city, when None), the given `cities`, and timestamps in [since, until).
+    City and day filters prune whole partitions before any file is opened.
+    """
+    _require_pyarrow()
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = _dataset(root or config.ARCHIVE_DIR)
+    if dataset is None:
+        return pd.DataFrame(columns=columns or ["timestamp", "city"] + VALUE_COLUMNS)
+
+    conditions = []
+    if cities is not None:
+        conditions.append(ds.field("city").isin(list(cities)))
+    for bound, op in ((since, "ge"), (until, "lt")):
+        if bound is None:
+            continue
+        bound = to_utc_datetime(bound)
+        day = ds.field("date") >= bound.date().isoformat() if op == "ge" else ds.field("date") <= bound.date().isoformat()
+        ts = pa.scalar(bound, type=pa.timestamp("us", tz="UTC"))
+        row = ds.field("timestamp") >= ts if op == "ge" else ds.field("timestamp") < ts
+        conditions.extend([day, row])
+
+    condition = None
+    for c in conditions:
+        condition = c if condition is None else condition & c
+
+    columns = columns or ["timestamp", "city"] + VALUE_COLUMNS
+    return dataset.to_table(columns=list(columns), filter=condition).to_pandas()
+
+
+def read_history_records(city: str, since, until=None, root: str = None) -> list:
+    """
+    Archived observations for `city` shaped like fetch_historical_weather_data
+    records (ISO timestamps, Kelvin temperatures), oldest first, so they can
+    stand in for an upstream history call. The rain chance is a percentage,
+    as build_weather_figure and the live stream plot it.
+    """
+    df = read_observations(cities=[city], since=since, until=until, root=root)
+    if df.empty:
+        return []
+    df = df.sort_values("timestamp")
+    for name in TEMPERATURE_COLUMNS:
+        df[name] = df[name] + 273.15
+    df["predicted_rain_chance"] = df["predicted_rain_chance"] * 100
+    df["timestamp"] = df["timestamp"].map(lambda ts: ts.isoformat())
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def _on_ingested(rows):
+    # Cheap on the request path: rows are written by the archiver task
+    if config.ARCHIVE_ENABLED and HAVE_PYARROW:
+        _pending.extend(rows)
+
+add_ingest_listener(_on_ingested)
+
+
+async def flush_pending() -> int:
+    """
+    Write rows stored since the last flush to the archive off the event loop.
+    """
+    if not _pending:
+        return 0
+    rows = _pending[:]
+    del _pending[:len(rows)]
+    try:
+        return await asyncio.to_thread(write_rows, rows)
+    except Exception:
+        # Keep the rows for the next attempt
+        _pending[:0] = rows
+        raise
+
+
+async def run_archiver(interval: float = None):
+    """
+    Flush newly stored observations to the archive every `interval` seconds until cancelled.
+    """
+    interval = interval or config.ARCHIVE_FLUSH_SECONDS
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                written = await flush_pending()
+                if written:
+                    logger.info("Archived %d observations", written)
+            except Exception as e:
+                logger.warning("Archive flush failed: %s", e)
+    finally:
+        try:
+            await flush_pending()
+        except Exception as e:
+            logger.warning("Final archive flush failed: %s", e)
+
+
+async def export_from_db(client, since, until=None, root: str = None) -> int:
+    """
+    Copy WeatherData in [since, until) from EdgeDB into the archive, one UTC day
+    per query so memory stays bounded. Re-exporting a range is idempotent.
+    """
+    _require_pyarrow()
+
+    since = to_utc_datetime(since).timestamp()
+    until = to_utc_datetime(until).timestamp() if until is not None else time.time()
+    total = 0
+    day_start = since
+    while day_start < until:
+        day_end = min((day_start // 86400 + 1) * 86400, until)
+        rows = await fetch_observations_between(client, day_start, day_end)
+        if rows:
+            total += await asyncio.to_thread(write_rows, rows, root)
+        day_start = day_end
+    logger.info("Exported %d observations to the archive", total)
+    return total
+
+
+async def _main(args):
+    import edgedb
+    from logging_config import configure_logging
+
+    configure_logging()
+    client = edgedb.create_async_client()
+    try:
+        until = time.time()
+        await export_from_db(client, until - args.days * 24 * 60 * 60, until)
+    finally:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export WeatherData from EdgeDB to the Parquet archive.")
+    parser.add_argument("--days", type=float, default=30, help="How many days back to export")
+    asyncio.run(_main(parser.parse_args()))
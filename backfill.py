@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+import config
+from db import insert_historical_weather_data
+from weather_collector import fetch_historical_weather_data, get_city_name_by_coordinates
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def split_windows(start_timestamp: int, end_timestamp: int, window_seconds: int):
+    """
+    Split [start, end) into consecutive windows no longer than `window_seconds`.
+    Boundaries fall on multiples of `window_seconds` since the epoch, so a later
+    run over a shifted range produces the same interior windows and can reuse
+    the checkpoint; only the partial windows at either end are fetched again.
+    """
+    windows = []
+    window_start = start_timestamp
+    while window_start < end_timestamp:
+        window_end = min((window_start // window_seconds + 1) * window_seconds, end_timestamp)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def _window_key(site: dict, window_start: int, window_end: int) -> str:
+    return f"{site['lat']},{site['lon']}:{window_start}-{window_end}"
+
+
+def load_checkpoint(path: str) -> set:
+    """
+    Return the keys of windows finished by earlier runs.
+    """
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f).get("completed", []))
+
+
+def save_checkpoint(path: str, completed: set):
+    # Write to a temp file and rename so an interrupted run never leaves a torn checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"completed": sorted(completed)}, f)
+    os.replace(tmp_path, path)
+
+
+async def run_backfill(sites, start_timestamp: int, end_timestamp: int, http_client, db_client,
+                       window_seconds: int = None, concurrency: int = None,
+                       rate_per_minute: float = None, checkpoint_path: str = None,
+                       progress: dict = None):
+    """
+    Backfill hourly history for `sites` over [start_timestamp, end_timestamp).
+
+    The range is split into windows the history API accepts, fetched
+    concurrently (bounded by a semaphore and a token-bucket rate limiter) and
+    upserted through the bulk insert path. Finished windows are recorded in a
+    checkpoint file, so re-running the same backfill resumes where it stopped.
+    Returns (and keeps updating) a progress dict.
+    """
+    window_seconds = window_seconds or int(config.BACKFILL_WINDOW_DAYS * 24 * 60 * 60)
+    concurrency = concurrency or config.BACKFILL_CONCURRENCY
+    rate_per_minute = rate_per_minute or config.BACKFILL_RATE_PER_MINUTE
+    checkpoint_path = checkpoint_path or config.BACKFILL_CHECKPOINT_PATH
+
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate_per_minute / 60.0, capacity=concurrency)
+    completed = load_checkpoint(checkpoint_path)
+    checkpoint_lock = asyncio.Lock()
+    windows = split_windows(start_timestamp, end_timestamp, window_seconds)
+
+    progress = progress if progress is not None else {}
+    progress.update({
+        "windows": len(sites) * len(windows),
+        "done": 0,
+        "skipped": 0,
+        "inserted": 0,
+        "errors": []
+    })
+
+    # Resolve each site's city name once instead of once per window
+    async def resolve_name(site):
+        if site.get("name"):
+            return site["name"]
+        await bucket.acquire()
+        return await get_city_name_by_coordinates(site["lat"], site["lon"], http_client)
+
+    async def run_window(site, city_name, window_start, window_end):
+        key = _window_key(site, window_start, window_end)
+        if key in completed:
+            progress["skipped"] += 1
+            return
+        async with semaphore:
+            try:
+                await bucket.acquire()
+                records = await fetch_historical_weather_data(
+                    site["lat"], site["lon"], window_start, window_end, http_client, city_name=city_name
+                )
+                reports = await insert_historical_weather_data(records, db_client)
+                failed = [r["error"] for r in reports if r["error"]]
+                progress["inserted"] += sum(r["inserted"] for r in reports)
+                if failed:
+                    raise RuntimeError("; ".join(failed))
+            except Exception as e:
+                progress["errors"].append({"window": key, "error": str(e)})
+                logger.warning("Backfill window %s failed: %s", key, e)
+                return
+        async with checkpoint_lock:
+            completed.add(key)
+            save_checkpoint(checkpoint_path, completed)
+        progress["done"] += 1
+
+    async def run_site(site):
+        try:
+            city_name = await resolve_name(site)
+        except Exception as e:
+            progress["errors"].append({"site": f"{site['lat']},{site['lon']}", "error": str(e)})
+            logger.warning("Backfill skipped site %s,%s: %s", site["lat"], site["lon"], e)
+            return
+        await asyncio.gather(*(run_window(site, city_name, s, e) for s, e in windows))
+
+    await asyncio.gather(*(run_site(site) for site in sites))
+    logger.info("Backfill finished: %d windows stored, %d already done, %d errors",
+                progress["done"], progress["skipped"], len(progress["errors"]))
+    return progress
+
+
+async def _main(args):
+    import edgedb
+    from logging_config import configure_logging
+    from weather_collector import create_http_client
+
+    configure_logging()
+    sites = config.SITES
+    if args.lat is not None and args.lon is not None:
+        sites = [{"lat": args.lat, "lon": args.lon, "name": None}]
+    if not sites:
+        raise SystemExit("No sites given: set WEATHER_SITES or pass --lat/--lon")
+
+    end_timestamp = int(datetime.utcnow().timestamp())
+    start_timestamp = end_timestamp - int(args.days * 24 * 60 * 60)
+
+    http_client = create_http_client()
+    db_client = edgedb.create_async_client()
+    try:
+        progress = await run_backfill(sites, start_timestamp, end_timestamp, http_client, db_client)
+        print(json.dumps(progress, indent=2))
+    finally:
+        await http_client.aclose()
+        await db_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill hourly weather history into EdgeDB.")
+    parser.add_argument("--days", type=float, default=30, help="How many days back to fetch")
+    parser.add_argument("--lat", type=float, help="Latitude (defaults to WEATHER_SITES)")
+    parser.add_argument("--lon", type=float, help="Longitude (defaults to WEATHER_SITES)")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import ipaddress
+import json
+import random
+import time
+import httpx
+
+# End-to-end load test against a running app. Start fake_owm.py and point the app
+# at it (see fake_owm.py) so runs are repeatable and use no API quota, then:
+#   python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --concurrency 1,10,50
+# A share of requests (--geoip-share) omits lat/lon and sends X-Forwarded-For from a
+# pool of --client-ips addresses, so the geo-IP cache and lookup are exercised too;
+# run the app with TRUST_FORWARDED_FOR=1 and without SITE_LAT/SITE_LON for that.
+
+ENDPOINTS = {
+    "collect": "/collect",
+    "predict": "/predict",
+    "visualization": "/visualization",
+    "visualization_data": "/visualization/data",
+    "summary_statistics": "/summary_statistics",
+    "forecast": "/forecast"
+}
+DEFAULT_ENDPOINTS = ("collect", "predict", "visualization", "summary_statistics")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank percentile of an ascending list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _is_error(response: httpx.Response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # Handlers report failures as {"status": "error"} with a 200
+    if response.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = response.json()
+        except ValueError:
+            return True
+        return isinstance(body, dict) and body.get("status") == "error"
+    return False
+
+
+def client_ip_pool(size: int, seed: int = 0) -> list:
+    # Distinct public addresses; private ones would all resolve to the server's own location
+    rng = random.Random(seed)
+    pool = set()
+    while len(pool) < size:
+        ip = ipaddress.IPv4Address(rng.getrandbits(32))
+        if ip.is_global:
+            pool.add(str(ip))
+    return sorted(pool)
+
+
+def request_mix(params: dict, geoip_share: float, client_ips: int, seed: int = 0):
+    """
+    Return a function giving (params, headers) for the next request: explicit
+    coordinates, or for `geoip_share` of requests none and an X-Forwarded-For
+    address from a pool of `client_ips`, leaving the location to the geo-IP path.
+    """
+    rng = random.Random(seed)
+    pool = client_ip_pool(client_ips, seed) if geoip_share > 0 and client_ips > 0 else []
+    unlocated = {key: value for key, value in params.items() if key not in ("lat", "lon")}
+
+    def next_request():
+        if pool and rng.random() < geoip_share:
+            return unlocated, {"X-Forwarded-For": rng.choice(pool)}
+        return params, {}
+
+    return next_request
+
+
+async def run_level(client: httpx.AsyncClient, path: str, next_request, concurrency: int, total: int) -> dict:
+    """
+    Send `total` requests to `path` from `concurrency` workers and summarize latencies.
+    """
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            params, headers = next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params, headers=headers)
+                failed = _is_error(response)
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0
+    }
+
+
+async def run_load_test(base_url: str, endpoints, concurrency_levels, requests_per_level: int,
+                        params: dict, warmup: int = 5, timeout: float = 30.0,
+                        geoip_share: float = 0.0, client_ips: int = 0) -> list:
+    results = []
+    next_request = request_mix(params, geoip_share, client_ips)
+    limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        for name in endpoints:
+            path = ENDPOINTS[name]
+            # Warm caches and connections so the first level is not penalized
+            for _ in range(warmup):
+                warmup_params, headers = next_request()
+                try:
+                    await client.get(path, params=warmup_params, headers=headers)
+                except httpx.HTTPError:
+                    pass
+            for concurrency in concurrency_levels:
+                result = await run_level(client, path, next_request, concurrency, requests_per_level)
+                result["endpoint"] = name
+                results.append(result)
+                print(f"{name:<20} c={concurrency:<4} {result['throughput_rps']:>8} req/s  "
+                      f"p50 {result['p50_ms']:>7} ms  p95 {result['p95_ms']:>7} ms  "
+                      f"p99 {result['p99_ms']:>7} ms  errors {result['errors']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the weather app and report throughput and latency percentiles.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint")
+    parser.add_argument("--lat", type=float, default=51.5085)
+    parser.add_argument("--lon", type=float, default=-0.1257)
+    parser.add_argument("--geoip-share", type=float, default=0.3,
+                        help="Share of requests sent without lat/lon, located from X-Forwarded-For")
+    parser.add_argument("--client-ips", type=int, default=50, help="Distinct X-Forwarded-For addresses to rotate through")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    results = asyncio.run(run_load_test(
+        args.base_url, endpoints, levels, args.requests,
+        {"lat": args.lat, "lon": args.lon}, warmup=args.warmup,
+        geoip_share=args.geoip_share, client_ips=args.client_ips
+    ))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+# Microbenchmarks for the hot functions on synthetic data at 24h / 30d / 1y scale.
+# Records median/min time and peak traced memory, compares against a saved
+# baseline and exits non-zero when something regresses past the threshold:
+#   python benchmarks/microbench.py --save-baseline      # record on a known-good tree
+#   python benchmarks/microbench.py --threshold 0.2      # later: fail on >20% regressions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import predictor  # noqa: E402
+from db import insert_weather_data_bulk, insert_historical_weather_data  # noqa: E402
+
+SCALES = {"24h": 24 * 3600, "30d": 30 * 24 * 3600, "1y": 365 * 24 * 3600}
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Single predictions are timed over at most this many rows per run
+PREDICT_CALLS = 100
+
+
+def synthetic_observations(span_seconds: int, step_seconds: int = 3600, city: str = "Benchville", seed: int = 0) -> list:
+    """
+    Hourly-style observations shaped like the history API records (Kelvin temperatures),
+    ending now, with a diurnal temperature cycle and occasional rain.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(1, span_seconds // step_seconds)
+    end = int(time.time()) // step_seconds * step_seconds
+    t = end - step_seconds * np.arange(n)[::-1]
+    hours = (t % 86400) / 3600.0
+    temperature = 283.0 + 5.0 * np.sin((hours - 9) / 24 * 2 * np.pi) + rng.normal(0, 1.0, n)
+    humidity = np.clip(rng.normal(70, 12, n), 20, 100).round()
+    rain = (humidity > 80) & (rng.random(n) < 0.6)
+    return [
+        {
+            "timestamp": pd.Timestamp(int(t[i]), unit="s", tz="UTC").isoformat(),
+            "temperature": float(temperature[i]),
+            "feels_like": float(temperature[i] - 1.2),
+            "temp_min": float(temperature[i] - 0.8),
+            "temp_max": float(temperature[i] + 0.9),
+            "pressure": int(1012 + rng.integers(-8, 8)),
+            "humidity": int(humidity[i]),
+            "wind_speed": float(abs(rng.normal(3.5, 1.5))),
+            "wind_deg": int(rng.integers(0, 360)),
+            "rainfall": float(rng.random() * 2) if rain[i] else 0.0,
+            "predicted_rain_chance": float(rng.random()),
+            "city": city,
+            "latitude": 49.28,
+            "longitude": -123.12
+        }
+        for i in range(n)
+    ]
+
+
+class _FakeTransaction:
+    def __init__(self, client):
+        self._client = client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def query(self, query, **kwargs):
+        return await self._client.query(query, **kwargs)
+
+
+class FakeEdgeDBClient:
+    """
+    Stand-in for edgedb.AsyncIOClient: decodes JSON payloads like the server
+    would and returns one object per row, without any network round trip.
+    """
+
+    def __init__(self):
+        self.queries = 0
+
+    async def query(self, query, **kwargs):
+        self.queries += 1
+        if "rows" in kwargs:
+            return json.loads(kwargs["rows"])
+        return [kwargs]
+
+    async def transaction(self):
+        yield _FakeTransaction(self)
+
+
+def _bench_predict_rain(rows, loop):
+    sample = rows[:PREDICT_CALLS]
+
+    def run():
+        for row in sample:
+            predictor.predict_rain(row)
+    return run
+
+
+def _bench_predict_rain_batch(rows, loop):
+    return lambda: predictor.predict_rain_batch(rows)
+
+
+def _bench_train_model(rows, loop):
+    df = pd.DataFrame(rows)
+    return lambda: predictor.train_model(df)
+
+
+def _bench_plot(rows, loop):
+    from visualize import plot_weather_data_interactive
+    return lambda: plot_weather_data_interactive(rows)
+
+
+def _bench_summary_statistics(rows, loop):
+    from main import compute_summary_statistics
+    df = pd.DataFrame(rows)
+    return lambda: compute_summary_statistics(df)
+
+
+def _recent_view(rows):
+    import recent_data
+    ring = recent_data.CityRing(len(rows))
+    ring.extend(np.array(
+        [(recent_data._to_datetime64(row["timestamp"]),)
+         + tuple(recent_data._number(row.get(name)) for name in recent_data.VALUE_FIELDS) for row in rows],
+        dtype=recent_data.RECENT_DTYPE
+    ))
+    return ring.view()
+
+
+def _bench_plot_recent(rows, loop):
+    from visualize import plot_weather_data_interactive
+    view = _recent_view(rows)
+    return lambda: plot_weather_data_interactive(view)
+
+
+def _bench_summary_statistics_recent(rows, loop):
+    from main import compute_summary_statistics
+    view = _recent_view(rows)
+    return lambda: compute_summary_statistics(view, temperature_in_kelvin=False)
+
+
+def _bench_insert_bulk(rows, loop):
+    client = FakeEdgeDBClient()
+    return lambda: loop.run_until_complete(insert_weather_data_bulk(rows, client))
+
+
+def _bench_insert_historical(rows, loop):
+    client = FakeEdgeDBClient()
+    return lambda: loop.run_until_complete(insert_historical_weather_data(rows, client))
+
+
+def _bench_insert_single(rows, loop):
+    from main import insert_weather_data
+    client = FakeEdgeDBClient()
+    sample = rows[:PREDICT_CALLS]
+
+    async def insert_all():
+        for row in sample:
+            await insert_weather_data(dict(row), client)
+    return lambda: loop.run_until_complete(insert_all())
+
+
+# name -> (setup(rows, loop) returning the callable to time, repeats override or None)
+BENCHMARKS = {
+    "predict_rain": (_bench_predict_rain, None),
+    "predict_rain_batch": (_bench_predict_rain_batch, None),
+    "train_model": (_bench_train_model, 1),
+    "plot_weather_data_interactive": (_bench_plot, None),
+    "compute_summary_statistics": (_bench_summary_statistics, None),
+    "plot_weather_data_interactive_recent": (_bench_plot_recent, None),
+    "compute_summary_statistics_recent": (_bench_summary_statistics_recent, None),
+    "insert_weather_data_bulk": (_bench_insert_bulk, None),
+    "insert_historical_weather_data": (_bench_insert_historical, None),
+    "insert_weather_data": (_bench_insert_single, None),
+}
+
+
+def measure(func, repeats: int) -> dict:
+    """
+    Time `func` `repeats` times after one warm-up call, then run it once more
+    under tracemalloc for the peak allocation.
+    """
+    func()
+    timings = []
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+
+def run_benchmarks(names, scales, repeats: int = 5, step_seconds: int = 3600) -> dict:
+    results = {}
+    loop = asyncio.new_event_loop()
+    model_dir = tempfile.mkdtemp(prefix="weather-bench-")
+    # Keep the benchmark model away from the real one
+    predictor.MODEL_PATH = os.path.join(model_dir, "rain_model.pkl")
+    predictor.COMPILED_MODEL_PATH = os.path.join(model_dir, "rain_model.npz")
+    # Measure inference itself, not cache lookups
+    predictor.prediction_cache.maxsize = 0
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor.train_model(pd.DataFrame(synthetic_observations(SCALES["30d"], step_seconds, seed=1)))
+
+        for scale in scales:
+            rows = synthetic_observations(SCALES[scale], step_seconds)
+            for name in names:
+                setup, repeats_override = BENCHMARKS[name]
+                func = setup(rows, loop)
+                # Silence the prints and sklearn warnings in the measured code paths
+                with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    result = measure(func, repeats_override or repeats)
+                result["rows"] = len(rows)
+                key = f"{name}[{scale}]"
+                results[key] = result
+                print(f"{key:<45} median {result['median_s'] * 1000:>10.2f} ms  "
+                      f"min {result['min_s'] * 1000:>10.2f} ms  peak {result['peak_kib']:>10.1f} KiB")
+    finally:
+        loop.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float, memory_threshold: float, noise_ms: float) -> list:
+    """
+    Return human-readable regressions of `results` against `baseline`.
+    Time differences below `noise_ms` are ignored so microsecond timings do not flap.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        slower = result["median_s"] - base["median_s"]
+        if slower > base["median_s"] * threshold and slower * 1000 > noise_ms:
+            regressions.append(f"{key}: median {base['median_s'] * 1000:.2f} -> {result['median_s'] * 1000:.2f} ms")
+        if result["peak_kib"] > base["peak_kib"] * (1 + memory_threshold):
+            regressions.append(f"{key}: peak {base['peak_kib']:.1f} -> {result['peak_kib']:.1f} KiB")
+    return regressions
+
+
+def _split(value: str, allowed) -> list:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise SystemExit(f"Unknown: {', '.join(unknown)} (choose from {', '.join(allowed)})")
+    return items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the hot functions and check for regressions.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated benchmarks to run")
+    parser.add_argument("--scales", default=",".join(SCALES), help="Comma-separated dataset scales")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--step-seconds", type=int, default=3600, help="Spacing of synthetic observations")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown of the median")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="Allowed relative growth of peak memory")
+    parser.add_argument("--noise-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        _split(args.only, BENCHMARKS), _split(args.scales, SCALES),
+        repeats=args.repeats, step_seconds=args.step_seconds
+    )
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"[INFO] Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold, args.noise_ms)
+        if regressions:
+            print("[WARN] Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("[INFO] No regressions against baseline")
+    else:
+        print(f"[WARN] No baseline at {args.baseline}; run with --save-baseline to record one")
@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start benchmark: imports the app in fresh interpreters and records import
+# time, peak RSS and module count, the per-worker cost paid on every autoscale:
+#   python benchmarks/startup.py --save-baseline      # record on a known-good tree
+#   python benchmarks/startup.py --threshold 0.2      # later: fail on >20% regressions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# Libraries the server must not pull in at import time
+HEAVY_MODULES = (
+    "matplotlib", "ipywidgets", "IPython", "sklearn", "plotly.express",
+    "pyarrow", "pyarrow.dataset", "pyarrow.parquet"
+)
+
+# Imported by every worker anyway; heavy modules it loads by itself (pandas
+# imports the pyarrow core when installed) are not the app's doing
+BASE_MODULE = "pandas"
+
+_CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_s": elapsed,
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+    "heavy": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure_import(module: str) -> dict:
+    """
+    Import `module` in a new interpreter and return its import time, peak RSS and loaded modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    # The app may log while importing; the measurement is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_startup(module: str, repeats: int) -> dict:
+    runs = [measure_import(module) for _ in range(repeats)]
+    timings = [run["import_s"] for run in runs]
+    unavoidable = set(measure_import(BASE_MODULE)["heavy"])
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_rss_kib": max(run["max_rss_kib"] for run in runs),
+        "modules": runs[-1]["modules"],
+        "heavy": [name for name in runs[-1]["heavy"] if name not in unavoidable]
+    }
+
+
+def compare(result: dict, base: dict, threshold: float, memory_threshold: float) -> list:
+    regressions = []
+    if result["median_s"] > base["median_s"] * (1 + threshold):
+        regressions.append(f"import time {base['median_s'] * 1000:.0f} -> {result['median_s'] * 1000:.0f} ms")
+    if result["max_rss_kib"] > base["max_rss_kib"] * (1 + memory_threshold):
+        regressions.append(f"peak RSS {base['max_rss_kib'] / 1024:.1f} -> {result['max_rss_kib'] / 1024:.1f} MiB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time and memory of the app.")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown of the median")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="Allowed relative growth of peak RSS")
+    args = parser.parse_args()
+
+    result = run_startup(args.module, args.repeats)
+    print(f"import {args.module:<20} median {result['median_s'] * 1000:>8.0f} ms  "
+          f"min {result['min_s'] * 1000:>8.0f} ms  peak RSS {result['max_rss_kib'] / 1024:>7.1f} MiB  "
+          f"modules {result['modules']}")
+
+    failed = False
+    if result["heavy"]:
+        print(f"[WARN] Heavy modules imported at startup: {', '.join(result['heavy'])}")
+        failed = True
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline[args.module] = result
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"[INFO] Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            base = json.load(f).get(args.module)
+        regressions = compare(result, base, args.threshold, args.memory_threshold) if base else []
+        if regressions:
+            print("[WARN] Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            failed = True
+        else:
+            print("[INFO] No regressions against baseline")
+    else:
+        print(f"[WARN] No baseline at {args.baseline}; run with --save-baseline to record one")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def grid_key(lat: float, lon: float, decimals: int = 2):
+    """
+    Quantize coordinates to a grid cell so nearby requests share one cache entry.
+    Two decimals is roughly a 1 km cell.
+    """
+    return (round(float(lat), decimals), round(float(lon), decimals))
+
+
+def time_bucket(timestamp: float, bucket_seconds: int) -> int:
+    """
+    Floor a unix timestamp to the start of its bucket.
+    """
+    return int(timestamp) // bucket_seconds * bucket_seconds
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache for async loaders.
+
+    - Entries expire after `ttl` seconds (a number, or a callable taking the
+      loaded value and returning seconds).
+    - Concurrent misses for the same key share a single in-flight load.
+    - For `stale_ttl` seconds after expiry the old value is still returned
+      while a background refresh runs (stale-while-revalidate).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl=60.0, stale_ttl: float = 0.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expiry(self, value, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        if callable(ttl):
+            ttl = ttl(value)
+        return time.monotonic() + ttl
+
+    def get(self, key, default=None):
+        """
+        Return a fresh cached value without loading, or `default`.
+        """
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            return default
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (value, self._expiry(value, ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Drop one key, or every entry when no key is given.
+        """
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Return the cached value for `key`, calling `fetch()` (a coroutine
+        function) on a miss. Errors from `fetch` are raised to every waiter
+        and nothing is cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            now = time.monotonic()
+            if now < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if now < expires_at + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch, ttl)
+                return value
+
+        self.misses += 1
+        # Shield the shared load so one cancelled waiter does not cancel it for the others
+        return await asyncio.shield(self._load(key, fetch, ttl))
+
+    def _load(self, key, fetch, ttl):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fetch, ttl))
+            self._inflight[key] = task
+        return task
+
+    async def _run(self, key, fetch, ttl):
+        try:
+            value = await fetch()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key, fetch, ttl):
+        if key in self._inflight:
+            return
+        task = self._load(key, fetch, ttl)
+        task.add_done_callback(self._log_refresh_error)
+
+    def _log_refresh_error(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh failed in %s: %s", self.name, task.exception())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,184 @@
+import logging
+import os
+import tempfile
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def publish_file(tmp_path: str, path: str):
+    """
+    Rename a finished mkstemp file over `path` with the mode a plain open()
+    would have given it; mkstemp creates files readable by their owner only.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp_path, 0o666 & ~umask)
+    os.replace(tmp_path, path)
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into packed NumPy arrays.
+
+    All trees share one node table (feature, threshold, left, right, leaf
+    probability). Leaves point to themselves, so every row can walk all trees
+    at once for a fixed number of vectorized steps. predict_proba matches
+    sklearn's output for the binary rain/no-rain model.
+    """
+
+    __slots__ = ("feature", "threshold", "left", "right", "leaf_proba", "roots", "max_depth", "source_stamp")
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, max_depth, source_stamp=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.source_stamp = source_stamp
+
+    @classmethod
+    def from_sklearn(cls, model, positive_class=1, source_stamp=None):
+        classes = list(model.classes_)
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves so extra traversal steps are no-ops
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+
+            counts = tree.value[:, 0, :]
+            leaf_proba = np.zeros(n_nodes, dtype=np.float64)
+            if positive_class in classes:
+                leaf_proba = counts[:, classes.index(positive_class)] / counts.sum(axis=1)
+            probas.append(leaf_proba)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds),
+            np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(probas), np.asarray(roots, dtype=np.int32),
+            max_depth, source_stamp
+        )
+
+    def predict_positive(self, X) -> np.ndarray:
+        """
+        Return the positive-class probability for each row of X.
+        """
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+        return self.leaf_proba[nodes].mean(axis=1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        sklearn-compatible (n_rows, 2) probabilities: [no rain, rain].
+        """
+        positive = self.predict_positive(X)
+        return np.column_stack([1.0 - positive, positive])
+
+    def save(self, path: str):
+        # Write to a temp file and rename so readers never load a partial file
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rain_model.", suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f, feature=self.feature, threshold=self.threshold,
+                    left=self.left, right=self.right, leaf_proba=self.leaf_proba,
+                    roots=self.roots, max_depth=self.max_depth,
+                    source_stamp=np.asarray(self.source_stamp if self.source_stamp else (-1, -1), dtype=np.int64)
+                )
+            publish_file(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            stamp = tuple(int(v) for v in data["source_stamp"])
+            return cls(
+                data["feature"], data["threshold"], data["left"], data["right"],
+                data["leaf_proba"], data["roots"], int(data["max_depth"]),
+                None if stamp == (-1, -1) else stamp
+            )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ("feature", "threshold", "left", "right", "leaf_proba", "roots"))
+
+
+def sample_check_data(model, n_rows: int = 2000, seed: int = 0) -> np.ndarray:
+    """
+    Draw rows spread around the split thresholds the forest actually uses,
+    including the thresholds themselves, to exercise both sides of every split.
+    """
+    rng = np.random.default_rng(seed)
+    n_features = model.n_features_in_
+    X = np.zeros((n_rows, n_features))
+    for f in range(n_features):
+        thresholds = np.concatenate([
+            est.tree_.threshold[est.tree_.feature == f] for est in model.estimators_
+        ])
+        if len(thresholds) == 0:
+            continue
+        picks = rng.choice(thresholds, n_rows)
+        spread = max(thresholds.max() - thresholds.min(), 1.0)
+        jitter = rng.normal(0, spread * 0.05, n_rows)
+        X[:, f] = np.where(rng.random(n_rows) < 0.2, picks, picks + jitter)
+    return X
+
+
+def compile_model(model, path: str, X_check=None, source_stamp=None, atol: float = 1e-9) -> CompiledForest:
+    """
+    Compile `model`, check it against sklearn's predict_proba on X_check (or
+    sampled rows), and save it to `path`. Raises ValueError on any mismatch.
+    """
+    compiled = CompiledForest.from_sklearn(model, source_stamp=source_stamp)
+
+    X_check = sample_check_data(model) if X_check is None else np.asarray(X_check, dtype=np.float64)
+    expected = model.predict_proba(X_check)
+    if 1 in list(model.classes_):
+        expected = expected[:, list(model.classes_).index(1)]
+    else:
+        expected = np.zeros(len(X_check))
+    actual = compiled.predict_positive(X_check)
+    if not np.allclose(actual, expected, rtol=0, atol=atol):
+        worst = float(np.max(np.abs(actual - expected)))
+        raise ValueError(f"Compiled model does not match sklearn (max abs diff {worst:.3g})")
+
+    compiled.save(path)
+    logger.info("Compiled model saved to %s (%.0f KiB)", path, compiled.nbytes / 1024)
+    return compiled
+
+
+if __name__ == "__main__":
+    import joblib
+    import predictor
+
+    model = joblib.load(predictor.MODEL_PATH)
+    stat = os.stat(predictor.MODEL_PATH)
+    compile_model(model, predictor.COMPILED_MODEL_PATH, source_stamp=(stat.st_mtime_ns, stat.st_size))
@@ -0,0 +1,139 @@
+import os
+
+# Runtime settings, read once from the environment with sensible defaults.
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Shared HTTP client used for all upstream API calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # seconds
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # seconds, read/write/pool
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # seconds
+HTTP2_ENABLED = _env_bool("HTTP2_ENABLED", False)
+HTTP_VERIFY_SSL = _env_bool("HTTP_VERIFY_SSL", False)
+
+# Upstream API endpoints; point these at fake_owm.py for offline runs and load tests
+OWM_BASE_URL = os.getenv("OWM_BASE_URL", "https://api.openweathermap.org").rstrip("/")
+OWM_HISTORY_BASE_URL = os.getenv("OWM_HISTORY_BASE_URL", "https://history.openweathermap.org").rstrip("/")
+GEOIP_BASE_URL = os.getenv("GEOIP_BASE_URL", "http://ip-api.com").rstrip("/")
+
+# Upstream response cache (see cache.TTLCache)
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "1024"))
+CACHE_GRID_DECIMALS = int(os.getenv("CACHE_GRID_DECIMALS", "2"))  # ~1 km grid cells
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "120"))  # seconds
+WEATHER_CACHE_STALE_TTL = float(os.getenv("WEATHER_CACHE_STALE_TTL", "600"))  # seconds
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "600"))  # seconds
+HISTORY_CACHE_STALE_TTL = float(os.getenv("HISTORY_CACHE_STALE_TTL", "1800"))  # seconds
+HISTORY_CACHE_BUCKET = int(os.getenv("HISTORY_CACHE_BUCKET", "600"))  # seconds
+
+# Location resolution (see geolocation.py). Setting SITE_LAT/SITE_LON skips the IP lookup.
+SITE_LAT = float(os.environ["SITE_LAT"]) if os.getenv("SITE_LAT") else None
+SITE_LON = float(os.environ["SITE_LON"]) if os.getenv("SITE_LON") else None
+SITE_CITY = os.getenv("SITE_CITY")
+GEOIP_CACHE_TTL = float(os.getenv("GEOIP_CACHE_TTL", "86400"))  # seconds
+GEOIP_CACHE_MAXSIZE = int(os.getenv("GEOIP_CACHE_MAXSIZE", "10000"))
+TRUST_FORWARDED_FOR = _env_bool("TRUST_FORWARDED_FOR", False)
+
+# Rows per statement/transaction for bulk inserts into EdgeDB
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "500"))
+
+
+def _parse_sites(value: str) -> list:
+    # "lat,lon[,name];lat,lon[,name];..." -> [{"lat", "lon", "name"}, ...]
+    sites = []
+    for item in value.split(";"):
+        parts = [p.strip() for p in item.split(",")]
+        if len(parts) < 2 or not parts[0]:
+            continue
+        sites.append({
+            "lat": float(parts[0]),
+            "lon": float(parts[1]),
+            "name": parts[2] if len(parts) > 2 and parts[2] else None
+        })
+    return sites
+
+
+# Sites to collect for, used by the backfill and scheduler
+SITES = _parse_sites(os.getenv("WEATHER_SITES", ""))
+
+# Historical backfill (see backfill.py)
+BACKFILL_WINDOW_DAYS = float(os.getenv("BACKFILL_WINDOW_DAYS", "7"))  # history API allows up to a week per call
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))
+BACKFILL_RATE_PER_MINUTE = float(os.getenv("BACKFILL_RATE_PER_MINUTE", "60"))  # upstream calls, per API plan
+BACKFILL_CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", "backfill_checkpoint.json")
+
+# Background collection of current weather for SITES (see scheduler.py)
+SCHEDULER_ENABLED = _env_bool("SCHEDULER_ENABLED", False)
+SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", "600"))  # seconds between rounds
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "30"))  # max random start offset per site
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "10"))
+SCHEDULER_QUEUE_SIZE = int(os.getenv("SCHEDULER_QUEUE_SIZE", "1000"))
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "100"))
+SCHEDULER_FLUSH_SECONDS = float(os.getenv("SCHEDULER_FLUSH_SECONDS", "5"))
+
+# Serialized dashboard figures (see figure_cache.py)
+FIGURE_CACHE_MAXSIZE = int(os.getenv("FIGURE_CACHE_MAXSIZE", "256"))
+FIGURE_CACHE_TTL = float(os.getenv("FIGURE_CACHE_TTL", "600"))  # seconds
+FIGURE_CACHE_BUCKET = int(os.getenv("FIGURE_CACHE_BUCKET", "600"))  # seconds
+PLOT_POINTS_PER_WINDOW = int(os.getenv("PLOT_POINTS_PER_WINDOW", "300"))  # per trace and range-selector window
+VISUALIZATION_MAX_HOURS = int(os.getenv("VISUALIZATION_MAX_HOURS", str(7 * 24)))
+
+# Where /summary_statistics gets its numbers by default: "memory", "recent", "db", "archive" or "api" (upstream history)
+# "memory" serves from rolling_stats, then the recent data store, and falls back to "api" when neither has the window
+SUMMARY_STATISTICS_SOURCE = os.getenv("SUMMARY_STATISTICS_SOURCE", "memory")
+
+# Window lengths kept by the in-memory rolling statistics (see rolling_stats.py)
+ROLLING_WINDOW_HOURS = [int(h) for h in os.getenv("ROLLING_WINDOW_HOURS", "24").split(",") if h.strip()]
+
+# Recent observations kept per city in memory (see recent_data.py)
+RECENT_DATA_HOURS = int(os.getenv("RECENT_DATA_HOURS", str(VISUALIZATION_MAX_HOURS)))  # loaded from EdgeDB at startup
+RECENT_DATA_CAPACITY = int(os.getenv("RECENT_DATA_CAPACITY", "4096"))  # rows per city
+
+# Model training jobs (see training_jobs.py)
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "1"))  # worker processes
+TRAINING_JOB_HISTORY = int(os.getenv("TRAINING_JOB_HISTORY", "100"))  # finished jobs kept for status
+
+# Serve predictions from the flat-array compiled forest (see compiled_forest.py)
+COMPILED_MODEL_ENABLED = _env_bool("COMPILED_MODEL_ENABLED", False)
+
+# Multi-day forecast (see forecast.py). The upstream feed is reissued every
+# FORECAST_ISSUE_INTERVAL seconds; scored forecasts are cached until then.
+FORECAST_ISSUE_INTERVAL = int(os.getenv("FORECAST_ISSUE_INTERVAL", str(3 * 60 * 60)))  # seconds
+FORECAST_CACHE_MIN_TTL = float(os.getenv("FORECAST_CACHE_MIN_TTL", "60"))  # seconds
+FORECAST_CACHE_MAXSIZE = int(os.getenv("FORECAST_CACHE_MAXSIZE", "1024"))
+
+# Logging (see logging_config.py). LOG_LEVELS sets per-module levels: "db=DEBUG,httpx=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "httpx=WARNING,httpcore=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))  # share of DEBUG records kept
+LOG_PAYLOADS = _env_bool("LOG_PAYLOADS", False)  # dump full upstream/ingest payloads at DEBUG
+
+# Parquet archive of observations (see archive.py, needs pyarrow)
+ARCHIVE_ENABLED = _env_bool("ARCHIVE_ENABLED", False)  # append stored observations to the archive
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_FLUSH_SECONDS = float(os.getenv("ARCHIVE_FLUSH_SECONDS", "60"))
+# Where /train-model and /visualization/data read observations: "api" (upstream history) or "archive"
+TRAINING_DATA_SOURCE = os.getenv("TRAINING_DATA_SOURCE", "api")
+TRAINING_ARCHIVE_DAYS = float(os.getenv("TRAINING_ARCHIVE_DAYS", "365"))  # archive history used for training, all sites
+# /visualization/data also accepts "recent" (recent_data.py), which falls back to "api" for spans it does not hold;
+# it is the default when the scheduler keeps the store filled
+VISUALIZATION_SOURCE = os.getenv("VISUALIZATION_SOURCE", "recent" if SCHEDULER_ENABLED else "api")
+
+# Live dashboard updates over Server-Sent Events (see live.py)
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))  # pending events per client before it is dropped
+LIVE_REPLAY_SIZE = int(os.getenv("LIVE_REPLAY_SIZE", "50"))  # recent events per city replayed on reconnect
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+
+# /metrics: how often the event-loop lag probe wakes up
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))  # seconds
+
+# Prediction memoization; 0 disables the cache
+PREDICTION_CACHE_MAXSIZE = int(os.getenv("PREDICTION_CACHE_MAXSIZE", "4096"))
+PREDICTION_CACHE_DECIMALS = int(os.getenv("PREDICTION_CACHE_DECIMALS", "2"))  # feature rounding before lookup
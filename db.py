@@ -1,7 +1,200 @@
+import json
+import logging
+from datetime import datetime, timezone
 import edgedb
+import config
+import metrics
 
 client = edgedb.create_async_client()
 
+logger = logging.getLogger(__name__)
+
+# Callbacks run with the list of stored rows after every successful write
+# (cache invalidation, live updates, in-memory aggregates, ...)
+_ingest_listeners = []
+
+def add_ingest_listener(callback):
+    _ingest_listeners.append(callback)
+
+def notify_ingested(rows):
+    for callback in _ingest_listeners:
+        try:
+            callback(rows)
+        except Exception as e:
+            logger.warning("Ingest listener %s failed: %s", callback.__name__, e)
+
+# One statement upserts a whole chunk of rows passed as a single JSON array.
+# Re-ingested hours (same city and timestamp) update the existing observation.
+BULK_INSERT_QUERY = """
+    FOR row IN json_array_unpack(<json>$rows) UNION (
+        INSERT WeatherData {
+            city := <str>row['city'],
+            temperature := <float32>row['temperature'],
+            feels_like := <float32>row['feels_like'],
+            temp_min := <float32>row['temp_min'],
+            temp_max := <float32>row['temp_max'],
+            pressure := <int16>row['pressure'],
+            humidity := <int16>row['humidity'],
+            wind_speed := <float32>row['wind_speed'],
+            wind_deg := <int16>row['wind_deg'],
+            timestamp := <datetime>row['timestamp'],
+            latitude := <float64>json_get(row, 'latitude'),
+            longitude := <float64>json_get(row, 'longitude'),
+            rainfall := <float32>json_get(row, 'rainfall'),
+            predicted_rain_chance := <float64>json_get(row, 'predicted_rain_chance')
+        }
+        UNLESS CONFLICT ON (.city, .timestamp)
+        ELSE (
+            UPDATE WeatherData SET {
+                temperature := <float32>row['temperature'],
+                feels_like := <float32>row['feels_like'],
+                temp_min := <float32>row['temp_min'],
+                temp_max := <float32>row['temp_max'],
+                pressure := <int16>row['pressure'],
+                humidity := <int16>row['humidity'],
+                wind_speed := <float32>row['wind_speed'],
+                wind_deg := <int16>row['wind_deg'],
+                rainfall := <float32>json_get(row, 'rainfall'),
+                predicted_rain_chance := <float64>json_get(row, 'predicted_rain_chance')
+                    ?? WeatherData.predicted_rain_chance
+            }
+        )
+    )
+"""
+
+# Metrics reported by the summary statistics, in response order
+SUMMARY_METRICS = ("temperature", "humidity", "wind_speed", "rainfall")
+
+def _summary_fields(metric: str) -> str:
+    # math::mean needs a non-empty set and math::var at least two values
+    values = f".elements.{metric}"
+    return f"""
+        {metric}_mean := (math::mean({values}) IF EXISTS {values} ELSE <float64>{{}}),
+        {metric}_min := min({values}),
+        {metric}_max := max({values}),
+        {metric}_var := (math::var({values}) IF count({values}) > 1 ELSE <float64>{{}}),"""
+
+# Aggregates per city and time window computed in the database; only one row
+# per (city, window) crosses the wire
+SUMMARY_STATISTICS_QUERY = f"""
+    WITH
+        since := <datetime>$since,
+        recent := (
+            SELECT WeatherData
+            FILTER .timestamp >= since AND ((.city = <optional str>$city) ?? true)
+        )
+    SELECT (
+        GROUP recent
+        USING time_window := <int64>math::floor(
+            duration_get(.timestamp - since, 'totalseconds') / <float64>$window_seconds
+        )
+        BY .city, time_window
+    ) {{
+        city := .key.city,
+        time_window := .key.time_window,
+        observations := count(.elements),{"".join(_summary_fields(m) for m in SUMMARY_METRICS)}
+    }}
+    ORDER BY .city THEN .time_window
+"""
+
+async def fetch_summary_statistics(client, since, city: str = None, window_seconds: int = None):
+    """
+    Compute mean, max, min and variance of SUMMARY_METRICS with EdgeQL aggregates,
+    grouped by city and by consecutive windows of `window_seconds` starting at
+    `since` (one window covering everything when not given).
+    Returns a list of {"city", "window_start", "observations", "summary_statistics"}
+    where summary_statistics has the same shape as main.compute_summary_statistics.
+    """
+    since = to_utc_datetime(since)
+    if window_seconds is None:
+        window_seconds = max(1, int((datetime.now(timezone.utc) - since).total_seconds()) + 1)
+
+    with metrics.DB_LATENCY.time(query="summary_statistics"):
+        rows = await client.query(
+            SUMMARY_STATISTICS_QUERY,
+            since=since,
+            city=city,
+            window_seconds=float(window_seconds)
+        )
+
+    results = []
+    for row in rows:
+        stats = {}
+        for metric in SUMMARY_METRICS:
+            stats[metric] = {}
+            for stat in ("mean", "max", "min", "var"):
+                value = getattr(row, f"{metric}_{stat}")
+                stats[metric][stat] = round(float(value), 2) if value is not None else None
+        results.append({
+            "city": row.city,
+            "window_start": datetime.fromtimestamp(since.timestamp() + row.time_window * window_seconds, tz=timezone.utc),
+            "observations": row.observations,
+            "summary_statistics": stats
+        })
+    return results
+
+async def fetch_observations_since(client, since):
+    """
+    Return stored observations newer than `since` as dicts, oldest first.
+    """
+    with metrics.DB_LATENCY.time(query="observations_since"):
+        records = await client.query("""
+            SELECT WeatherData {
+                city,
+                timestamp,
+                temperature,
+                humidity,
+                wind_speed,
+                rainfall,
+                predicted_rain_chance
+            }
+            FILTER .timestamp >= <datetime>$since
+            ORDER BY .timestamp
+        """, since=to_utc_datetime(since))
+    return [
+        {
+            "city": r.city,
+            "timestamp": r.timestamp,
+            "temperature": r.temperature,
+            "humidity": r.humidity,
+            "wind_speed": r.wind_speed,
+            "rainfall": r.rainfall,
+            "predicted_rain_chance": r.predicted_rain_chance
+        }
+        for r in records
+    ]
+
+# Every stored field except the relation to City, as exported to the archive
+OBSERVATION_FIELDS = (
+    "city", "timestamp", "temperature", "feels_like", "temp_min", "temp_max", "pressure",
+    "humidity", "wind_speed", "wind_deg", "rainfall", "predicted_rain_chance", "latitude", "longitude"
+)
+
+async def fetch_observations_between(client, start, end):
+    """
+    Return every stored field of observations in [start, end) as dicts, oldest first.
+    """
+    with metrics.DB_LATENCY.time(query="observations_between"):
+        records = await client.query(f"""
+            SELECT WeatherData {{ {", ".join(OBSERVATION_FIELDS)} }}
+            FILTER .timestamp >= <datetime>$start AND .timestamp < <datetime>$end
+            ORDER BY .timestamp
+        """, start=to_utc_datetime(start), end=to_utc_datetime(end))
+    return [{field: getattr(r, field) for field in OBSERVATION_FIELDS} for r in records]
+
+def to_utc_datetime(ts) -> datetime:
+    """
+    Normalize an epoch number, ISO string or datetime to an aware UTC datetime.
+    Naive values are taken to be UTC, which is what the collectors produce.
+    """
+    if isinstance(ts, (int, float)):
+        return datetime.fromtimestamp(ts, tz=timezone.utc)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
 async def insert_weather_data(data):
     try:
         await client.query("""
@@ -33,4 +226,68 @@ async def insert_weather_data(data):
         wind_deg=data["wind_deg"],
         timestamp=data["timestamp"])
     except Exception as e:
-        print(" Error inserting weather data:", e)
+        logger.error("Error inserting weather data: %s", e)
+
+async def insert_weather_data_bulk(rows, client, chunk_size: int = None):
+    """
+    Upsert many WeatherData rows with one round trip per chunk.
+    Each chunk is a single parameterized statement run in its own transaction,
+    so a bad chunk is rolled back without affecting the others.
+    Returns one report per chunk: {"chunk", "rows", "inserted", "error"}.
+    """
+    chunk_size = chunk_size or config.BULK_INSERT_CHUNK_SIZE
+    reports = []
+
+    # A single statement cannot insert and then upsert the same key, so keep
+    # only the last row for each (city, timestamp)
+    unique_rows = {}
+    for row in rows:
+        row = dict(row, timestamp=to_utc_datetime(row["timestamp"]).isoformat())
+        unique_rows[(row["city"], row["timestamp"])] = row
+    rows = list(unique_rows.values())
+
+    for chunk_index, start in enumerate(range(0, len(rows), chunk_size)):
+        chunk = rows[start:start + chunk_size]
+        report = {"chunk": chunk_index, "rows": len(chunk), "inserted": 0, "error": None}
+        try:
+            payload = json.dumps(chunk, default=str)
+            async for tx in client.transaction():
+                async with tx:
+                    with metrics.DB_LATENCY.time(query="bulk_insert"):
+                        inserted = await tx.query(BULK_INSERT_QUERY, rows=payload)
+            report["inserted"] = len(inserted)
+            notify_ingested(chunk)
+        except Exception as e:
+            report["error"] = str(e)
+            logger.warning("Bulk insert chunk %d (%d rows) failed: %s", chunk_index, len(chunk), e)
+        reports.append(report)
+
+    return reports
+
+async def insert_historical_weather_data(weather_data_list, client, chunk_size: int = None):
+    """
+    Normalize raw historical records from the collector (Kelvin, epoch or ISO
+    timestamps, missing rainfall) and upsert them in bulk.
+    Returns the per-chunk reports from insert_weather_data_bulk.
+    """
+    rows = []
+    for weather_data in weather_data_list:
+        row = dict(weather_data)
+
+        # Ensure rainfall always has a value
+        row["rainfall"] = row.get("rainfall") or 0.0
+
+        # Convert timestamp (can be int/float epoch or ISO string) to an aware UTC datetime
+        row["timestamp"] = to_utc_datetime(row["timestamp"])
+
+        # Convert temperatures from Kelvin to Celsius
+        temp_fields = ["temperature", "feels_like", "temp_min", "temp_max"]
+        for field in temp_fields:
+            if field in row and row[field] is not None:
+                row[field] -= 273.15
+        rows.append(row)
+
+    logger.info("Inserting %d historical records", len(rows))
+
+    # Insert into EdgeDB in chunks, one statement and transaction per chunk
+    return await insert_weather_data_bulk(rows, client, chunk_size)
@@ -0,0 +1,102 @@
+import numpy as np
+
+# Windows offered by the dashboard's range selector (6h, 12h, 1d, 7d), in seconds
+RANGE_WINDOWS = (6 * 3600, 12 * 3600, 24 * 3600, 7 * 24 * 3600)
+
+
+def minmax_indices(y, n_out: int):
+    """
+    Keep the minimum and maximum of each of n_out // 2 equal-count buckets.
+    Preserves peaks (e.g. rain showers) exactly. Returns sorted indices into y.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_buckets < 1 or n <= n_out:
+        return np.arange(n)
+
+    bucket = np.arange(n) * n_buckets // n
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+
+    # Sort by (bucket, value): the first entry of each bucket is its minimum, the last its maximum.
+    # Missing values sort to the end for the minimum and to the start for the maximum.
+    by_min = np.lexsort((np.where(np.isnan(y), np.inf, y), bucket))
+    by_max = np.lexsort((np.where(np.isnan(y), -np.inf, y), bucket))
+    return np.unique(np.concatenate([by_min[starts], by_max[ends]]))
+
+
+def lttb_indices(x, y, n_out: int):
+    """
+    Largest-Triangle-Three-Buckets: pick n_out points that keep the visual
+    shape of a line. Bucket averages are computed in one vectorized pass; the
+    selection itself walks the buckets since each pick depends on the previous one.
+    Returns sorted indices into x/y.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the interior points; first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+
+    valid = ~np.isnan(y)
+    y_filled = np.where(valid, y, 0.0)
+    valid_counts = np.add.reduceat(valid[:n - 1].astype(np.int64), edges[:-1])
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_y = np.add.reduceat(y_filled[:n - 1], edges[:-1]) / valid_counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for k in range(n_out - 2):
+        start, end = edges[k], edges[k + 1]
+        if k + 1 < n_out - 2:
+            next_x, next_y = avg_x[k + 1], avg_y[k + 1]
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        if np.isnan(next_y):
+            next_y = y[a] if valid[a] else 0.0
+        ax = x[a]
+        ay = y[a] if valid[a] else next_y
+        area = np.abs((ax - next_x) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y - ay))
+        area = np.where(valid[start:end], area, -1.0)
+        a = start + int(np.argmax(area))
+        selected[k + 1] = a
+    return selected
+
+
+def tiered_indices(t, y, points_per_window: int, windows=RANGE_WINDOWS, method: str = "lttb"):
+    """
+    Downsample a time series so every range-selector window stays within budget.
+
+    `t` holds ascending timestamps in seconds. The series is cut at each window
+    boundary counted back from the latest point (last 6h, 6-12h, 12h-1d, 1d-7d,
+    older) and each tier is reduced to `points_per_window` points. Zooming to any
+    window therefore shows full detail for recent data while the whole payload
+    stays bounded by (len(windows) + 1) * points_per_window.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    n = len(t)
+    if n <= points_per_window:
+        return np.arange(n)
+
+    cutoffs = t[-1] - np.asarray(sorted(windows), dtype=np.float64)
+    # Tier boundaries as positions in t, oldest first
+    bounds = np.r_[0, np.searchsorted(t, cutoffs[::-1], side="left"), n]
+
+    pieces = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if hi <= lo:
+            continue
+        if method == "minmax":
+            local = minmax_indices(y[lo:hi], points_per_window)
+        else:
+            local = lttb_indices(t[lo:hi], y[lo:hi], points_per_window)
+        pieces.append(local + lo)
+    return np.concatenate(pieces)
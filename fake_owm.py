@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import time
+from datetime import datetime
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Local stand-in for the OpenWeatherMap current/forecast/history APIs and ip-api.com.
+# Responses replay the JSON fixtures in FIXTURES_DIR with timestamps shifted to the
+# requested time range, so runs are repeatable and cost no API quota. Point the app
+# at it with OWM_BASE_URL, OWM_HISTORY_BASE_URL and GEOIP_BASE_URL, e.g.
+#   python fake_owm.py --port 8001 --latency-ms 80 --error-rate 0.01
+#   OWM_BASE_URL=http://127.0.0.1:8001 OWM_HISTORY_BASE_URL=http://127.0.0.1:8001 \
+#   GEOIP_BASE_URL=http://127.0.0.1:8001 uvicorn main:app
+
+FIXTURES_DIR = os.getenv("FAKE_OWM_FIXTURES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "owm"))
+
+TEMPERATURE_FIELDS = ("temp", "feels_like", "temp_min", "temp_max")
+
+
+class FakeSettings:
+    """
+    Latency and error injection, adjustable at runtime through POST /_fake/settings.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+
+    def update(self, values: dict):
+        for name in ("latency_ms", "jitter_ms", "error_rate"):
+            if name in values:
+                setattr(self, name, float(values[name]))
+        if "error_status" in values:
+            self.error_status = int(values["error_status"])
+        if "seed" in values:
+            self.random = random.Random(values["seed"])
+
+    def as_dict(self) -> dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status
+        }
+
+    def delay(self) -> float:
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> dict:
+    fixtures = {}
+    for name in ("weather", "forecast", "history", "geoip"):
+        with open(os.path.join(directory, f"{name}.json")) as f:
+            fixtures[name] = json.load(f)
+    return fixtures
+
+
+def _to_units(entry: dict, units: str) -> dict:
+    # Fixtures are stored in OWM's default units (Kelvin)
+    if units == "metric":
+        for field in TEMPERATURE_FIELDS:
+            entry["main"][field] = round(entry["main"][field] - 273.15, 2)
+    elif units == "imperial":
+        for field in TEMPERATURE_FIELDS:
+            entry["main"][field] = round((entry["main"][field] - 273.15) * 9 / 5 + 32, 2)
+    return entry
+
+
+def _replay(entries: list, start: int, step: int, count: int, units: str) -> list:
+    # Cycle the fixture entries over `count` steps starting at `start`
+    replayed = []
+    for i in range(count):
+        entry = _to_units(copy.deepcopy(entries[i % len(entries)]), units)
+        entry["dt"] = start + i * step
+        replayed.append(entry)
+    return replayed
+
+
+def create_app(settings: FakeSettings = None, fixtures: dict = None) -> FastAPI:
+    settings = settings or FakeSettings()
+    fixtures = fixtures or load_fixtures()
+    counts = {}
+
+    app = FastAPI(title="Fake OpenWeatherMap")
+    app.state.settings = settings
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        path = request.url.path
+        if path.startswith("/_fake"):
+            return await call_next(request)
+        counts[path] = counts.get(path, 0) + 1
+        delay = settings.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if settings.should_fail():
+            return JSONResponse({"cod": settings.error_status, "message": "injected error"}, status_code=settings.error_status)
+        return await call_next(request)
+
+    @app.get("/data/2.5/weather")
+    async def current_weather(lat: float, lon: float, units: str = "standard"):
+        data = _to_units(copy.deepcopy(fixtures["weather"]), units)
+        data["dt"] = int(time.time())
+        data["coord"] = {"lat": lat, "lon": lon}
+        return data
+
+    @app.get("/data/2.5/forecast")
+    async def forecast(lat: float, lon: float, units: str = "standard", cnt: int = 40):
+        start = int(time.time()) // 10800 * 10800 + 10800
+        entries = _replay(fixtures["forecast"]["list"], start, 10800, min(cnt, 40), units)
+        for entry in entries:
+            entry["dt_txt"] = datetime.utcfromtimestamp(entry["dt"]).strftime("%Y-%m-%d %H:%M:%S")
+        data = copy.deepcopy(fixtures["forecast"])
+        data.update({"cnt": len(entries), "list": entries})
+        data["city"]["coord"] = {"lat": lat, "lon": lon}
+        return data
+
+    @app.get("/data/2.5/history/city")
+    async def history(lat: float, lon: float, start: int, end: int, units: str = "standard"):
+        # One entry per hour in [start, end), capped at a week like the real API
+        first = (start + 3599) // 3600 * 3600
+        count = max(0, min((end - first + 3599) // 3600, 7 * 24))
+        entries = _replay(fixtures["history"]["list"], first, 3600, count, units)
+        data = copy.deepcopy(fixtures["history"])
+        data.update({"message": f"Count: {len(entries)}", "cnt": len(entries), "list": entries})
+        return data
+
+    @app.get("/json/")
+    @app.get("/json/{ip}")
+    async def geoip(ip: str = ""):
+        data = copy.deepcopy(fixtures["geoip"])
+        data["query"] = ip or data["query"]
+        return data
+
+    @app.get("/_fake/settings")
+    async def get_settings():
+        return settings.as_dict()
+
+    @app.post("/_fake/settings")
+    async def set_settings(request: Request):
+        settings.update(await request.json())
+        return settings.as_dict()
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return {"requests": counts}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve fake OpenWeatherMap and geo-IP endpoints from fixtures.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected errors")
+    parser.add_argument("--seed", type=int, help="Seed for repeatable latency/error sequences")
+    args = parser.parse_args()
+
+    settings = FakeSettings(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed)
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
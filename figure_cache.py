@@ -0,0 +1,49 @@
+import asyncio
+import time
+import config
+import metrics
+from cache import TTLCache, time_bucket
+from db import add_ingest_listener
+from visualize import build_weather_figure
+
+# Serialized figure JSON keyed by (city, data version, time bucket)
+figure_cache = TTLCache(
+    maxsize=config.FIGURE_CACHE_MAXSIZE,
+    ttl=config.FIGURE_CACHE_TTL,
+    name="figure"
+)
+
+# Bumped whenever observations for a city are stored, so cached figures for it stop matching
+_data_versions = {}
+
+def data_version(city) -> int:
+    return _data_versions.get(city, 0)
+
+def mark_data_changed(city):
+    _data_versions[city] = data_version(city) + 1
+
+def _on_ingested(rows):
+    for city in {row.get("city") for row in rows}:
+        mark_data_changed(city)
+
+add_ingest_listener(_on_ingested)
+
+@metrics.timed(metrics.FIGURE_RENDER_LATENCY, function="render_figure_json")
+def _render_figure_json(weather_data):
+    fig = build_weather_figure(weather_data)
+    return fig.to_json() if fig is not None else None
+
+async def get_figure_json(city, load_weather_data, hours: int = 24):
+    """
+    Return the serialized dashboard figure for `city` over the last `hours`,
+    building it only on a cache miss. `load_weather_data` is a coroutine
+    function returning the observations to plot (anything build_weather_figure accepts). Returns None when there is nothing to plot.
+    """
+    key = (city, hours, data_version(city), time_bucket(time.time(), config.FIGURE_CACHE_BUCKET))
+
+    async def build():
+        weather_data = await load_weather_data()
+        # Figure construction and serialization are CPU-bound; keep them off the event loop
+        return await asyncio.to_thread(_render_figure_json, weather_data)
+
+    return await figure_cache.get_or_fetch(key, build)
@@ -0,0 +1,58 @@
+import time
+import numpy as np
+import config
+from cache import TTLCache, grid_key, time_bucket
+from predictor import FEATURE_COLUMNS, predict_rain_matrix
+from weather_collector import fetch_forecast_data
+
+
+def _next_issuance(now: float) -> int:
+    return time_bucket(now, config.FORECAST_ISSUE_INTERVAL) + config.FORECAST_ISSUE_INTERVAL
+
+
+def _seconds_until_next_issuance(forecast: dict) -> float:
+    return max(config.FORECAST_CACHE_MIN_TTL, forecast["next_update"] - time.time())
+
+
+# Scored forecasts keyed by grid cell, kept until the feed is reissued
+forecast_cache = TTLCache(
+    maxsize=config.FORECAST_CACHE_MAXSIZE,
+    ttl=_seconds_until_next_issuance,
+    name="forecast"
+)
+
+
+def score_forecast(entries: list) -> list:
+    """
+    Add a rain_probability to every forecast entry. All horizons go into one
+    feature matrix and are scored with a single predict_proba call.
+    """
+    if not entries:
+        return []
+    X = np.array([[entry[f] for f in FEATURE_COLUMNS] for entry in entries], dtype=np.float64)
+    probabilities = predict_rain_matrix(X).tolist()
+    return [dict(entry, rain_probability=p) for entry, p in zip(entries, probabilities)]
+
+
+async def _load_forecast(lat: float, lon: float, client):
+    entries = await fetch_forecast_data(lat, lon, client)
+    scored = score_forecast(entries)
+    return {
+        "city": entries[0]["city"] if entries else None,
+        "next_update": _next_issuance(time.time()),
+        "forecast": scored
+    }
+
+
+async def get_forecast(lat: float, lon: float, client=None) -> dict:
+    """
+    Return {"city", "next_update", "forecast": [...]} for the grid cell around
+    lat/lon, fetching and scoring the feed only once per issuance.
+    """
+    cell_lat, cell_lon = grid_key(lat, lon, config.CACHE_GRID_DECIMALS)
+    forecast = await forecast_cache.get_or_fetch(
+        (cell_lat, cell_lon),
+        lambda: _load_forecast(cell_lat, cell_lon, client)
+    )
+    # Callers get their own copy of the entry list
+    return dict(forecast, forecast=[dict(entry) for entry in forecast["forecast"]])
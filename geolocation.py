@@ -0,0 +1,69 @@
+import ipaddress
+import httpx
+import config
+from cache import TTLCache
+from weather_collector import timed_get
+
+GEOIP_URL = config.GEOIP_BASE_URL + "/json/{ip}"
+
+# Client IP -> (lat, lon, city); locations of an IP rarely change, so entries live long
+geoip_cache = TTLCache(
+    maxsize=config.GEOIP_CACHE_MAXSIZE,
+    ttl=config.GEOIP_CACHE_TTL,
+    name="geoip"
+)
+
+def configured_site():
+    """
+    Return the (lat, lon, city) configured through SITE_LAT/SITE_LON, or None.
+    """
+    if config.SITE_LAT is None or config.SITE_LON is None:
+        return None
+    return config.SITE_LAT, config.SITE_LON, config.SITE_CITY
+
+def _is_public_ip(ip: str) -> bool:
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+def client_ip(request) -> str:
+    """
+    Return the caller's IP, honouring X-Forwarded-For when running behind a trusted proxy.
+    """
+    if config.TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else ""
+
+async def lookup_ip_location(ip: str, client: httpx.AsyncClient):
+    """
+    Resolve an IP to (lat, lon, city) through ip-api.com, cached per IP.
+    Private and loopback addresses (local development) resolve to the server's own location.
+    """
+    query_ip = ip if _is_public_ip(ip) else ""
+
+    async def fetch():
+        response = await timed_get(client, GEOIP_URL.format(ip=query_ip), "geoip")
+        data = response.json()
+        if data.get("status") == "fail":
+            raise ValueError(f"IP location lookup failed for '{query_ip}': {data.get('message')}")
+        return data["lat"], data["lon"], data["city"]
+
+    return await geoip_cache.get_or_fetch(query_ip or "self", fetch)
+
+async def resolve_location(request, client: httpx.AsyncClient, lat: float = None, lon: float = None):
+    """
+    Return (lat, lon, city) for a request without blocking the event loop.
+    Explicit coordinates win, then the configured site, then the caller's IP.
+    City is None when coordinates are given explicitly.
+    """
+    if lat is not None and lon is not None:
+        return lat, lon, None
+
+    site = configured_site()
+    if site is not None:
+        return site
+
+    return await lookup_ip_location(client_ip(request), client)
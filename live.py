@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict, deque
+from zoneinfo import ZoneInfo
+import config
+import rolling_stats
+from db import add_ingest_listener, to_utc_datetime
+
+logger = logging.getLogger(__name__)
+
+# Dashboard times are shown in this zone (see visualize.build_weather_figure);
+# points are sent as wall-clock strings so Plotly places them on the same axis.
+DASHBOARD_TZ = ZoneInfo("America/Vancouver")
+
+# Fields pushed per point; they match the `meta` of the dashboard figure's traces
+POINT_FIELDS = ("rainfall", "predicted_rain_chance", "temperature", "humidity")
+
+# Points remembered per city to tell new or changed observations from repeats
+SENT_POINTS_LIMIT = 1000
+
+
+class CityChannel:
+    """
+    Shared fan-out for one city. Each ingest is turned into one delta event
+    (only points that are new or changed since the last event), serialized
+    once and queued to every subscriber. Recent events are kept so a client
+    reconnecting with Last-Event-ID only receives what it missed.
+    """
+
+    def __init__(self, city: str, replay_size: int, queue_size: int):
+        self.city = city
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.replay = deque(maxlen=replay_size)  # (event id, encoded event)
+        self.sent = OrderedDict()  # timestamp -> point already pushed
+        self.next_id = 1
+
+    def subscribe(self, last_event_id: str = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id is not None and last_event_id.isdigit():
+            missed = [encoded for event_id, encoded in self.replay if event_id > int(last_event_id)]
+            for encoded in missed[-self.queue_size:]:
+                queue.put_nowait(encoded)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def _delta(self, rows) -> list:
+        points = {}
+        for row in rows:
+            if row.get("timestamp") is None:
+                continue
+            ts = to_utc_datetime(row["timestamp"])
+            point = {"time": ts.astimezone(DASHBOARD_TZ).strftime("%Y-%m-%d %H:%M:%S")}
+            for field in POINT_FIELDS:
+                point[field] = row.get(field)
+            if point["predicted_rain_chance"] is not None:
+                # The figure plots the prediction as a percentage
+                point["predicted_rain_chance"] = round(point["predicted_rain_chance"] * 100, 2)
+            if self.sent.get(ts) != point:
+                points[ts] = point
+
+        for ts, point in points.items():
+            self.sent[ts] = point
+            self.sent.move_to_end(ts)
+        while len(self.sent) > SENT_POINTS_LIMIT:
+            self.sent.popitem(last=False)
+        return [points[ts] for ts in sorted(points)]
+
+    def publish(self, rows):
+        if not self.subscribers:
+            return
+        points = self._delta(rows)
+        if not points:
+            return
+
+        event_id = self.next_id
+        self.next_id += 1
+        data = json.dumps({
+            "city": self.city,
+            "points": points,
+            "summary_statistics": rolling_stats.get_summary_statistics(self.city, 24)
+        }, default=str)
+        encoded = f"id: {event_id}\nevent: update\ndata: {data}\n\n"
+        self.replay.append((event_id, encoded))
+
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(encoded)
+            except asyncio.QueueFull:
+                # Too slow to keep up: disconnect it; the browser reconnects with Last-Event-ID
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(queue)
+
+
+_channels = {}  # city -> CityChannel
+
+
+def get_channel(city: str) -> CityChannel:
+    channel = _channels.get(city)
+    if channel is None:
+        channel = _channels[city] = CityChannel(city, config.LIVE_REPLAY_SIZE, config.LIVE_QUEUE_SIZE)
+    return channel
+
+
+def subscriber_count() -> int:
+    return sum(len(channel.subscribers) for channel in _channels.values())
+
+
+def _on_ingested(rows):
+    by_city = {}
+    for row in rows:
+        if row.get("city") in _channels:
+            by_city.setdefault(row["city"], []).append(row)
+    for city, city_rows in by_city.items():
+        _channels[city].publish(city_rows)
+
+add_ingest_listener(_on_ingested)
+
+
+async def event_stream(city: str, last_event_id: str = None, keepalive: float = None):
+    """
+    Yield Server-Sent Events for `city` until the client goes away.
+    """
+    keepalive = keepalive or config.LIVE_KEEPALIVE_SECONDS
+    channel = get_channel(city)
+    queue = channel.subscribe(last_event_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                encoded = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            if encoded is None:
+                logger.info("Dropped slow live subscriber for %s", city)
+                return
+            yield encoded
+    finally:
+        channel.unsubscribe(queue)
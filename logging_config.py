@@ -0,0 +1,126 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+import config
+
+# Structured logging: request paths only enqueue records; a QueueListener thread
+# formats and writes them, so stdout never blocks a handler.
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    One JSON object per line with time, level, logger, message and any `extra` fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key != "always":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human-readable lines with any `extra` fields appended as key=value.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        extras = [f"{key}={value!r}" for key, value in vars(record).items()
+                  if key not in _RECORD_FIELDS and key != "always"]
+        return " ".join([line] + extras)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a `rate` share of DEBUG records, unless a record was logged with extra={"always": True}.
+    Dropped records are never queued or formatted.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0 or getattr(record, "always", False):
+            return True
+        return random.random() < self.rate
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    # The listener runs in this process, so skip QueueHandler's pickling-oriented
+    # formatting and only resolve the message; the rest happens on the listener thread.
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _parse_levels(value: str) -> dict:
+    # "db=DEBUG,httpx=WARNING" -> {"db": "DEBUG", "httpx": "WARNING"}
+    levels = {}
+    for item in value.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """
+    Route all logging through a queue to a background writer thread.
+    Safe to call more than once; only the first call installs the handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if config.LOG_FORMAT == "json":
+        output.setFormatter(StructuredFormatter())
+    else:
+        output.setFormatter(TextFormatter())
+
+    handler = _EnqueueHandler(queue.SimpleQueue())
+    handler.addFilter(SamplingFilter(config.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(config.LOG_LEVEL)
+    for name, level in _parse_levels(config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def log_payload(logger: logging.Logger, message: str, payload):
+    """
+    Log a full upstream/ingest payload at DEBUG, only when LOG_PAYLOADS is set.
+    The payload is serialized on the listener thread, not by the caller.
+    """
+    if config.LOG_PAYLOADS and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={"payload": copy.copy(payload), "always": True})
@@ -1,27 +1,44 @@
-import ssl
+import asyncio
 import edgedb
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Body
 from contextlib import asynccontextmanager
-from weather_collector import fetch_weather_data, fetch_historical_weather_data
-from predictor import train_model, predict_rain
-from db import insert_weather_data
+from weather_collector import (
+    fetch_weather_data, fetch_historical_weather_data, create_http_client,
+    fetch_weather_data_cached, fetch_historical_weather_data_cached,
+    weather_cache, history_cache
+)
+from predictor import predict_rain, predict_rain_batch, prediction_cache_stats, FEATURE_COLUMNS
+from db import (
+    insert_weather_data, insert_historical_weather_data, to_utc_datetime, notify_ingested,
+    fetch_summary_statistics, SUMMARY_METRICS
+)
+from backfill import run_backfill
+from scheduler import run_scheduler
+import rolling_stats
+import recent_data
+import training_jobs
+import archive
+import live
+import config
+import metrics
+import time
+from geolocation import resolve_location, geoip_cache
 from datetime import datetime
-import requests
 import json
-from typing import Optional
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.offline import plot
-from fastapi.responses import HTMLResponse
+from typing import List
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+import numpy as np
 import pandas as pd
-import base64
 import logging
-import pytz  
+from logging_config import configure_logging, log_payload
 from zoneinfo import ZoneInfo
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
-from visualize import plot_weather_data_interactive
-logging.basicConfig(level=logging.DEBUG)
+from visualize import PLOT_CONFIG, plotly_cdn_url
+from figure_cache import get_figure_json, figure_cache
+from forecast import get_forecast, forecast_cache
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI
 app = FastAPI()
@@ -36,39 +53,98 @@ def init_edgedb(branch="main"):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Setup code (this replaces "on_event('startup')")
-    print("App startup")
+    logger.info("App startup")
     app.state.client_main = init_edgedb("main")  # For current weather
     app.state.client_historical = init_edgedb("historical")  # For historical weather
+    app.state.http_client = create_http_client()  # Pooled keep-alive client for upstream APIs
+    try:
+        await rolling_stats.rebuild(app.state.client_main)
+    except Exception as e:
+        logger.warning("Could not rebuild rolling statistics from the database: %s", e)
+    try:
+        await recent_data.rebuild(app.state.client_main)
+    except Exception as e:
+        logger.warning("Could not load recent observations from the database: %s", e)
+    app.state.loop_lag_task = asyncio.create_task(
+        metrics.monitor_event_loop_lag(config.METRICS_LOOP_LAG_INTERVAL)
+    )
+    app.state.archive_task = None
+    if config.ARCHIVE_ENABLED:
+        # Append newly stored observations to the Parquet archive in the background
+        app.state.archive_task = asyncio.create_task(archive.run_archiver())
+    app.state.scheduler_task = None
+    if config.SCHEDULER_ENABLED and config.SITES:
+        # Collect current weather for the configured sites in the background
+        app.state.scheduler_task = asyncio.create_task(
+            run_scheduler(config.SITES, app.state.http_client, app.state.client_main)
+        )
     yield
     # Cleanup code (this replaces "on_event('shutdown')")
-    print("App shutdown")
+    logger.info("App shutdown")
+    if app.state.scheduler_task is not None:
+        app.state.scheduler_task.cancel()
+        await asyncio.gather(app.state.scheduler_task, return_exceptions=True)
+    if app.state.archive_task is not None:
+        # Cancelled after the scheduler so its last batch is archived too
+        app.state.archive_task.cancel()
+        await asyncio.gather(app.state.archive_task, return_exceptions=True)
+    app.state.loop_lag_task.cancel()
+    training_jobs.shutdown()
+    await app.state.http_client.aclose()
     await app.state.client_main.aclose()
     await app.state.client_historical.aclose()
 
 # Use lifespan event handler for setup/cleanup
 app = FastAPI(lifespan=lifespan)
 
-# Function to get the current location (latitude and longitude) based on IP address
-def get_ip_location():
-    response = requests.get("http://ip-api.com/json/")
-    data = response.json()
+for _cache in (weather_cache, history_cache, geoip_cache, figure_cache, forecast_cache):
+    metrics.track_cache(_cache.name, _cache.stats)
+metrics.track_cache("prediction", prediction_cache_stats)
+metrics.CallbackMetric("weather_live_subscribers", "Open /stream connections.",
+                       lambda: [({}, live.subscriber_count())])
 
-    return data['lat'], data['lon'],data['city']
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (e.g. /train-model/{job_id}) to keep the series count bounded
+        route = request.scope.get("route")
+        metrics.HTTP_LATENCY.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        )
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of latency histograms, cache hit ratios and event-loop lag."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Function to get the location (latitude, longitude, city) for a request.
+# Explicit lat/lon or a configured site skip the IP lookup entirely.
+async def get_ip_location(request: Request, lat: float = None, lon: float = None):
+    return await resolve_location(request, app.state.http_client, lat, lon)
 
 @app.get("/")
 async def read_root():
     return {"message": "Hello, World!"}
 
 @app.get("/collect")
-async def collect_weather(lat: float = None, lon: float = None):
+async def collect_weather(request: Request, lat: float = None, lon: float = None):
     # If lat/lon are not provided, fetch based on IP location
     if lat is None or lon is None:
-        lat, lon, city = get_ip_location()
-        print(f"Fetched IP location - Lat: {lat}, Lon: {lon}")
+        lat, lon, city = await get_ip_location(request)
+        logger.debug("Fetched IP location - Lat: %s, Lon: %s", lat, lon)
 
     try:
         # Fetch weather data from OpenWeatherMap API
-        weather_data = await fetch_weather_data(lat, lon)
+        weather_data = await fetch_weather_data(lat, lon, app.state.http_client)
 
         # Check if the weather data contains the expected keys
         required_keys = ["temperature", "feels_like", "temp_min", "temp_max", "pressure", "humidity", "wind_speed", "wind_deg", "rainfall"]
@@ -98,48 +174,48 @@ async def collect_weather(lat: float = None, lon: float = None):
             })
             return {"status": "success", "prediction": prediction, "weather_data": weather_data}
         except ValueError as e:
-            print(f"[Warning] Prediction skipped: {e}")
+            logger.warning("Prediction skipped: %s", e)
             return {"status": "success", "prediction": None, "weather_data": weather_data}
     
     except Exception as e:
-        print(f"Error fetching or processing weather data: {e}")
+        logger.warning("Error fetching or processing weather data: %s", e)
         return {"status": "error", "message": str(e)}
 
 
 @app.get("/collect-historical")
-async def collect_historical_weather():
-    lat, lon, city = get_ip_location()  # Get the current location based on IP address
+async def collect_historical_weather(request: Request, lat: float = None, lon: float = None):
+    lat, lon, city = await get_ip_location(request, lat, lon)  # Get the current location based on IP address
     
     # Calculate start and end timestamps (24 hours ago to now)
     end_timestamp = int(datetime.utcnow().timestamp())
     start_timestamp = end_timestamp - 24 * 60 * 60  # 24 hours ago
 
     # Fetch historical weather data
-    historical_weather_data = await fetch_historical_weather_data(lat, lon, start_timestamp, end_timestamp)
+    historical_weather_data = await fetch_historical_weather_data(lat, lon, start_timestamp, end_timestamp, app.state.http_client)
     
     # Insert historical weather data into EdgeDB
-    await insert_historical_weather_data(historical_weather_data, app.state.client_historical)
+    reports = await insert_historical_weather_data(historical_weather_data, app.state.client_historical)
+    errors = [r for r in reports if r["error"]]
 
-    return {"status": "success", "message": "Historical weather data collected and stored"}
+    return {
+        "status": "error" if errors else "success",
+        "message": "Historical weather data collected and stored",
+        "inserted": sum(r["inserted"] for r in reports),
+        "errors": errors
+    }
 
 
 
 @app.get("/visualization", response_class=HTMLResponse)
-async def visualization(request: Request):
-    lat, lon, city = get_ip_location()
+async def visualization(request: Request, lat: float = None, lon: float = None):
+    lat, lon, city = await get_ip_location(request, lat, lon)
     current_time = datetime.now(ZoneInfo("America/Vancouver")).strftime("%Y-%m-%d %H:%M:%S %Z")
 
-    end_timestamp = int(datetime.utcnow().timestamp())
-    start_timestamp = end_timestamp - 24 * 60 * 60
-    weather_data = await fetch_historical_weather_data(lat, lon, start_timestamp, end_timestamp)
-
-    if not weather_data:
-        return HTMLResponse("<p>No weather data available to visualize.</p>")
-
-    current_weather = await fetch_weather_data(lat, lon)
+    current_weather = await fetch_weather_data_cached(lat, lon, app.state.http_client)
     current_temp = current_weather.get("temperature", "N/A")
     current_humidity = current_weather.get("humidity", "N/A")
     current_rain = current_weather.get("rain", "0")
+    city = city or current_weather.get("city")
 
     try:
         rain_probability = predict_rain(current_weather)
@@ -147,13 +223,15 @@ async def visualization(request: Request):
     except:
         rain_forecast = "N/A"
 
-    try:
-        await insert_weather_data(current_weather, app.state.client_main)
-    except Exception as e:
-        logging.error(f"Error inserting weather data into database: {e}")
-
-    plot_html = plot_weather_data_interactive(weather_data)
+    # With the scheduler running, ingestion is the scheduler's job and page views stay read-only
+    if not config.SCHEDULER_ENABLED:
+        try:
+            await insert_weather_data(current_weather, app.state.client_main)
+        except Exception as e:
+            logger.error("Error inserting weather data into database: %s", e)
 
+    # The chart itself is rendered in the browser from /visualization/data;
+    # later observations arrive as deltas over /stream
     return templates.TemplateResponse("index.html", {
         "request": request,
         "city": city,
@@ -162,142 +240,214 @@ async def visualization(request: Request):
         "current_humidity": current_humidity,
         "current_rain": current_rain,
         "current_time": current_time,
-        "plot_html": plot_html
+        "plotly_cdn_url": plotly_cdn_url(),
+        "plot_data_url": str(request.url_for("visualization_data").include_query_params(lat=lat, lon=lon)),
+        "stream_url": str(request.url_for("stream").include_query_params(lat=lat, lon=lon))
     })
 
+@app.get("/stream")
+async def stream(request: Request, lat: float = None, lon: float = None):
+    """
+    Server-Sent Events with new observations, predictions and 24h stats for the
+    caller's city as they are ingested. Clients of the same city share one
+    fan-out, and each event only carries points the client has not seen yet.
+    """
+    lat, lon, city = await get_ip_location(request, lat, lon)
+    if city is None:
+        city = (await fetch_weather_data_cached(lat, lon, app.state.http_client)).get("city")
+
+    return StreamingResponse(
+        live.event_stream(city, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/visualization/data")
+async def visualization_data(request: Request, lat: float = None, lon: float = None, hours: int = 24):
+    """
+    Return the dashboard figure as Plotly JSON for client-side rendering.
+    Figures are cached per (city, data version, time bucket), so viewers of the
+    same city share one serialized payload until new observations arrive.
+    `hours` sets the time range; long ranges are downsampled per range-selector window.
+    """
+    hours = max(1, min(hours, config.VISUALIZATION_MAX_HOURS))
+    lat, lon, city = await get_ip_location(request, lat, lon)
+    if city is None:
+        city = (await fetch_weather_data_cached(lat, lon, app.state.http_client)).get("city")
+
+    async def load_weather_data():
+        end_timestamp = int(datetime.utcnow().timestamp())
+        start_timestamp = end_timestamp - hours * 60 * 60
+        if config.VISUALIZATION_SOURCE == "recent":
+            rows = recent_data.get_recent(city, start_timestamp)
+            if rows is not None:
+                # The figure is built in a worker thread; copy the (small) view so ingestion can't change it meanwhile
+                return rows.copy()
+        if config.VISUALIZATION_SOURCE == "archive":
+            return await asyncio.to_thread(archive.read_history_records, city, start_timestamp, end_timestamp)
+        return await fetch_historical_weather_data_cached(lat, lon, start_timestamp, end_timestamp, app.state.http_client)
+
+    figure_json = await get_figure_json(city, load_weather_data, hours)
+    if figure_json is None:
+        return {"status": "error", "message": "No weather data available to visualize."}
+
+    # Splice the cached JSON in directly instead of parsing and re-serializing it
+    body = '{"status": "success", "city": %s, "config": %s, "figure": %s}' % (
+        json.dumps(city), json.dumps(PLOT_CONFIG), figure_json
+    )
+    return Response(content=body, media_type="application/json")
+
 
 async def insert_weather_data(weather_data, client):
     try:
-        print("Data types of the API response fields:")
-        for key, value in weather_data.items():
-            print(f"{key}: {type(value)}")
-
-        print("Inserting data:", json.dumps(weather_data, indent=2, default=str))
+        log_payload(logger, "Inserting observation", weather_data)
 
         # Predict rain before saving
         try:
             rain_probability = predict_rain(weather_data)
-            print(f"[INFO] Predicted rain probability: {rain_probability}")
+            logger.debug("Predicted rain probability: %s", rain_probability)
         except Exception as pred_error:
-            print(f"[WARN] Could not predict rain: {pred_error}")
+            logger.warning("Could not predict rain: %s", pred_error)
             rain_probability = None
 
-        # Optional: delete all previous records (comment out in production)
-        await client.execute("DELETE WeatherData;")
-
         rainfall = weather_data.get("rainfall", 0.0)
 
-        await client.query("""
-            INSERT WeatherData {
-                city := <str>$city,
-                temperature := <float32>$temperature,
-                feels_like := <float32>$feels_like,
-                temp_min := <float32>$temp_min,
-                temp_max := <float32>$temp_max,
-                pressure := <int16>$pressure,
-                humidity := <int16>$humidity,
-                wind_speed := <float32>$wind_speed,
-                wind_deg := <int16>$wind_deg,
-                timestamp := <str>$timestamp,
-                rainfall := <float32>$rainfall,
-                predicted_rain_chance := <optional float64>$predicted_rain_chance
-            }
-        """,
-        city=weather_data["city"],
-        temperature=weather_data["temperature"],
-        feels_like=weather_data["feels_like"],
-        temp_min=weather_data["temp_min"],
-        temp_max=weather_data["temp_max"],
-        pressure=weather_data["pressure"],
-        humidity=weather_data["humidity"],
-        wind_speed=weather_data["wind_speed"],
-        wind_deg=weather_data["wind_deg"],
-        timestamp=weather_data["timestamp"],
-        rainfall=rainfall,
-        predicted_rain_chance=rain_probability)
-
-        print(f"[DEBUG] Successfully inserted weather data with prediction: {rain_probability}")
+        # Append-only: a repeated (city, timestamp) updates the existing observation
+        with metrics.DB_LATENCY.time(query="insert_observation"):
+            await client.query("""
+                INSERT WeatherData {
+                    city := <str>$city,
+                    temperature := <float32>$temperature,
+                    feels_like := <float32>$feels_like,
+                    temp_min := <float32>$temp_min,
+                    temp_max := <float32>$temp_max,
+                    pressure := <int16>$pressure,
+                    humidity := <int16>$humidity,
+                    wind_speed := <float32>$wind_speed,
+                    wind_deg := <int16>$wind_deg,
+                    timestamp := <datetime>$timestamp,
+                    latitude := <optional float64>$latitude,
+                    longitude := <optional float64>$longitude,
+                    rainfall := <float32>$rainfall,
+                    predicted_rain_chance := <optional float64>$predicted_rain_chance
+                }
+                UNLESS CONFLICT ON (.city, .timestamp)
+                ELSE (
+                    UPDATE WeatherData SET {
+                        temperature := <float32>$temperature,
+                        feels_like := <float32>$feels_like,
+                        temp_min := <float32>$temp_min,
+                        temp_max := <float32>$temp_max,
+                        pressure := <int16>$pressure,
+                        humidity := <int16>$humidity,
+                        wind_speed := <float32>$wind_speed,
+                        wind_deg := <int16>$wind_deg,
+                        rainfall := <float32>$rainfall,
+                        predicted_rain_chance := <optional float64>$predicted_rain_chance
+                    }
+                )
+            """,
+            city=weather_data["city"],
+            temperature=weather_data["temperature"],
+            feels_like=weather_data["feels_like"],
+            temp_min=weather_data["temp_min"],
+            temp_max=weather_data["temp_max"],
+            pressure=weather_data["pressure"],
+            humidity=weather_data["humidity"],
+            wind_speed=weather_data["wind_speed"],
+            wind_deg=weather_data["wind_deg"],
+            timestamp=to_utc_datetime(weather_data["timestamp"]),
+            latitude=weather_data.get("latitude"),
+            longitude=weather_data.get("longitude"),
+            rainfall=rainfall,
+            predicted_rain_chance=rain_probability)
+
+        logger.debug("Inserted observation for %s with prediction %s", weather_data.get("city"), rain_probability)
+        notify_ingested([dict(weather_data, predicted_rain_chance=rain_probability)])
 
     except Exception as e:
-        print("Error inserting weather data:", e)
+        logger.error("Error inserting weather data: %s", e)
 
 
-async def insert_historical_weather_data(weather_data_list, client):
-    for weather_data in weather_data_list:
-        try:
-            print(f"Inserting historical data: {weather_data}")
-
-            # Ensure rainfall always has a value
-            rainfall = weather_data.get("rainfall") or 0.0
-
-            # Convert timestamp (can be int/float epoch or ISO string)
-            ts = weather_data["timestamp"]
-            if isinstance(ts, (int, float)):
-                ts = datetime.utcfromtimestamp(ts)
-            elif isinstance(ts, str):
-                ts = datetime.fromisoformat(ts)
-            # Convert temperatures from Kelvin to Celsius
-            temp_fields = ["temperature", "feels_like", "temp_min", "temp_max"]
-            for field in temp_fields:
-                if field in weather_data and weather_data[field] is not None:
-                    weather_data[field] -= 273.15
-            # Insert into EdgeDB
-            await client.query("""
-            INSERT WeatherData {
-                city := <str>$city,
-                temperature := <float32>$temperature,
-                feels_like := <float32>$feels_like,
-                temp_min := <float32>$temp_min,
-                temp_max := <float32>$temp_max,
-                pressure := <int16>$pressure,
-                humidity := <int16>$humidity,
-                wind_speed := <float32>$wind_speed,
-                wind_deg := <int16>$wind_deg,
-                timestamp := <str>$timestamp,
-                rainfall := <float32>$rainfall,
-            }
-        """,
-        city=weather_data["city"],
-        temperature=weather_data["temperature"],
-        feels_like=weather_data["feels_like"],
-        temp_min=weather_data["temp_min"],
-        temp_max=weather_data["temp_max"],
-        pressure=weather_data["pressure"],
-        humidity=weather_data["humidity"],
-        wind_speed=weather_data["wind_speed"],
-        wind_deg=weather_data["wind_deg"],
-        timestamp=weather_data["timestamp"],
-        rainfall=rainfall
-        )
+@app.post("/backfill")
+async def start_backfill(request: Request, days: int = 30, lat: float = None, lon: float = None):
+    """
+    Start a background backfill of the last `days` of hourly history for the
+    configured sites (WEATHER_SITES), or for the request location if none are set.
+    """
+    current = getattr(app.state, "backfill", None)
+    if current and not current["task"].done():
+        return {"status": "error", "message": "A backfill is already running.", "progress": current["progress"]}
 
-        except Exception as e:
-            print(f"Error inserting historical weather data: {e}")
+    if config.SITES and (lat is None or lon is None):
+        sites = config.SITES
+    else:
+        lat, lon, city = await get_ip_location(request, lat, lon)
+        sites = [{"lat": lat, "lon": lon, "name": city}]
 
+    end_timestamp = int(datetime.utcnow().timestamp())
+    start_timestamp = end_timestamp - days * 24 * 60 * 60
+    progress = {}
+    task = asyncio.create_task(run_backfill(
+        sites, start_timestamp, end_timestamp,
+        app.state.http_client, app.state.client_historical,
+        progress=progress
+    ))
+    app.state.backfill = {"task": task, "progress": progress}
+    return {"status": "started", "sites": len(sites), "days": days}
+
+@app.get("/backfill")
+async def backfill_status():
+    current = getattr(app.state, "backfill", None)
+    if current is None:
+        return {"status": "idle"}
+    return {"status": "running" if not current["task"].done() else "finished", "progress": current["progress"]}
 
 
 @app.post("/train-model")
-async def train_weather_model():
-    lat, lon, city = get_ip_location()
+async def train_weather_model(request: Request, lat: float = None, lon: float = None, source: str = None):
+    source = source or config.TRAINING_DATA_SOURCE
+    if source == "archive":
+        # Column-pruned, time-filtered read of every site's archived observations
+        since = datetime.utcnow().timestamp() - config.TRAINING_ARCHIVE_DAYS * 24 * 60 * 60
+        df = await asyncio.to_thread(
+            archive.read_observations, columns=FEATURE_COLUMNS + ["rainfall"], since=since
+        )
+        if df.empty:
+            return {"status": "error", "message": "No archived observations available."}
+        job_id = training_jobs.submit_training_job(df)
+        return {"status": "accepted", "job_id": job_id, "message": f"Model training started on {len(df)} archived rows."}
+
+    lat, lon, city = await get_ip_location(request, lat, lon)
 
     # Get historical data from EdgeDB
     historical_data = await fetch_historical_weather_data(
         lat, lon,
         start_timestamp=int(datetime.utcnow().timestamp()) - 30 * 24 * 60 * 60,  # last 30 days
-        end_timestamp=int(datetime.utcnow().timestamp())
+        end_timestamp=int(datetime.utcnow().timestamp()),
+        client=app.state.http_client
     )
 
     if not historical_data:
         return {"status": "error", "message": "No historical data available."}
 
     df = pd.DataFrame(historical_data)
-    train_model(df)
-    return {"status": "success", "message": "Model trained successfully."}
+    job_id = training_jobs.submit_training_job(df)
+    return {"status": "accepted", "job_id": job_id, "message": "Model training started."}
+
+@app.get("/train-model/{job_id}")
+async def training_job_status(job_id: str):
+    job = training_jobs.get_job(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown training job: {job_id}"}
+    return {"status": "success", "job": job}
 
 @app.get("/predict")
-async def predict_rainfall():
+async def predict_rainfall(request: Request, lat: float = None, lon: float = None):
     try:
-        lat, lon, city = get_ip_location()
-        weather_data = await fetch_weather_data(lat, lon)
+        lat, lon, city = await get_ip_location(request, lat, lon)
+        weather_data = await fetch_weather_data_cached(lat, lon, app.state.http_client)
 
         if not weather_data:
             return {"status": "error", "message": "No current weather data."}
@@ -305,7 +455,7 @@ async def predict_rainfall():
         probability = predict_rain(weather_data)
         return {
             "status": "success",
-            "city": city,
+            "city": city or weather_data.get("city"),
             "rain_probability": probability,
             "weather_data": weather_data
         }
@@ -313,17 +463,108 @@ async def predict_rainfall():
     except Exception as e:
         return {"status": "error", "message": f"Prediction failed: {str(e)}"}
 
-def compute_summary_statistics(df: pd.DataFrame):
+# Maximum number of upstream weather fetches a single batch request runs at once
+BATCH_FETCH_CONCURRENCY = 20
+
+@app.post("/predict/batch")
+async def predict_rainfall_batch(locations: List[dict] = Body(...)):
+    """
+    Predict rain probability for many sites in one call.
+    Each item is either {"lat": ..., "lon": ...} or a dict with all FEATURE_COLUMNS.
+    Missing observations are fetched concurrently, then every site is scored
+    in a single batched prediction.
+    """
+    semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+
+    async def resolve(item):
+        if all(f in item for f in FEATURE_COLUMNS):
+            return item
+        if "lat" not in item or "lon" not in item:
+            raise ValueError("Each item needs either lat/lon or all model features")
+        async with semaphore:
+            return await fetch_weather_data_cached(item["lat"], item["lon"], app.state.http_client)
+
+    resolved = await asyncio.gather(*(resolve(item) for item in locations), return_exceptions=True)
+
+    results = [None] * len(locations)
+    ok_indexes = []
+    for i, weather_data in enumerate(resolved):
+        if isinstance(weather_data, Exception):
+            results[i] = {"index": i, "status": "error", "message": str(weather_data)}
+        else:
+            ok_indexes.append(i)
+
+    try:
+        probabilities = predict_rain_batch([resolved[i] for i in ok_indexes])
+    except ValueError as e:
+        return {"status": "error", "message": f"Prediction failed: {str(e)}"}
+
+    for i, probability in zip(ok_indexes, probabilities):
+        results[i] = {
+            "index": i,
+            "status": "success",
+            "city": resolved[i].get("city"),
+            "rain_probability": probability
+        }
+
+    return {"status": "success", "results": results}
+
+@app.get("/forecast")
+async def forecast_rainfall(request: Request, lat: float = None, lon: float = None):
+    """
+    Rain probability for every 3-hour step of the 5-day forecast.
+    """
+    try:
+        lat, lon, city = await get_ip_location(request, lat, lon)
+        forecast = await get_forecast(lat, lon, app.state.http_client)
+        if not forecast["forecast"]:
+            return {"status": "error", "message": "No forecast data."}
+        return {"status": "success", "city": city or forecast["city"], **forecast}
+    except Exception as e:
+        return {"status": "error", "message": f"Forecast failed: {str(e)}"}
+
+@app.get("/predict/cache-stats")
+async def get_prediction_cache_stats():
+    """Hit/miss counters of the in-process prediction cache."""
+    return {"status": "success", "cache": prediction_cache_stats()}
+
+def _summarize_columns(columns, temperature_in_kelvin: bool):
+    # NumPy equivalent of the DataFrame aggregation below: NaNs skipped, sample variance.
+    # Like rolling_stats, metrics without values are left out and a single value has
+    # no variance (None), since NaN cannot be sent as JSON.
+    summary = {}
+    for metric in SUMMARY_METRICS:
+        values = columns[metric]
+        values = values[~np.isnan(values)]
+        if metric == "temperature" and temperature_in_kelvin:
+            values = values - 273.15
+        if len(values) == 0:
+            continue
+        summary[metric] = {
+            "mean": round(float(values.mean()), 2),
+            "max": round(float(values.max()), 2),
+            "min": round(float(values.min()), 2),
+            "var": round(float(values.var(ddof=1)), 2) if len(values) > 1 else None
+        }
+    return summary
+
+def compute_summary_statistics(df, temperature_in_kelvin: bool = True):
     """
     Compute mean, max, min, variance for key weather metrics.
-    Converts temperature from Kelvin to Celsius.
+    `df` is a DataFrame, or a structured array such as a recent_data view,
+    which is aggregated column by column without building a DataFrame.
+    Converts temperature from Kelvin to Celsius without modifying the caller's data,
+    unless the data is already in Celsius (stored observations).
     """
+    if isinstance(df, np.ndarray):
+        return _summarize_columns(df, temperature_in_kelvin) if len(df) else {}
+
     if df.empty:
         return {}
 
     # Convert temperature from Kelvin to Celsius
-    if 'temperature' in df.columns:
-        df['temperature'] = df['temperature'] - 273.15
+    if temperature_in_kelvin and 'temperature' in df.columns:
+        df = df.assign(temperature=df['temperature'] - 273.15)
 
     # Compute summary statistics
     summary = df.agg({
@@ -336,19 +577,58 @@ def compute_summary_statistics(df: pd.DataFrame):
     return summary.to_dict()
 
 @app.get("/summary_statistics")
-async def summary_statistics():
-    lat, lon, city = get_ip_location()
+async def summary_statistics(request: Request, lat: float = None, lon: float = None,
+                             source: str = None, hours: int = 24):
+    lat, lon, city = await get_ip_location(request, lat, lon)
+    source = source or config.SUMMARY_STATISTICS_SOURCE
+
+    if source in ("memory", "recent", "db", "archive") and city is None:
+        city = (await fetch_weather_data_cached(lat, lon, app.state.http_client)).get("city")
+
+    if source == "memory":
+        # Incrementally maintained aggregates; fall back to the API for untracked cities/windows
+        stats = rolling_stats.get_summary_statistics(city, hours)
+        if stats is not None:
+            return {"status": "success", "city": city, "summary_statistics": stats}
+        source = "recent"
+
+    if source == "recent":
+        # Column views of the city's ring buffer; falls back to the API for spans it does not hold
+        rows = recent_data.get_recent(city, datetime.utcnow().timestamp() - hours * 60 * 60)
+        if rows is not None and len(rows):
+            stats = compute_summary_statistics(rows, temperature_in_kelvin=False)
+            return {"status": "success", "city": city, "summary_statistics": stats}
+
+    if source == "db":
+        # Aggregate stored observations in EdgeDB; only the aggregate row comes back
+        since = datetime.utcnow().timestamp() - hours * 60 * 60
+        results = await fetch_summary_statistics(app.state.client_main, since, city=city)
+        if not results:
+            return {"status": "error", "message": "No stored observations available."}
+        return {"status": "success", "city": city, "summary_statistics": results[0]["summary_statistics"]}
+
+    if source == "archive":
+        # Only the summarized columns of this city's recent partitions are read
+        since = datetime.utcnow().timestamp() - hours * 60 * 60
+        df = await asyncio.to_thread(
+            archive.read_observations, columns=list(SUMMARY_METRICS), cities=[city], since=since
+        )
+        if df.empty:
+            return {"status": "error", "message": "No archived observations available."}
+        stats = compute_summary_statistics(df, temperature_in_kelvin=False)
+        return {"status": "success", "city": city, "summary_statistics": stats}
 
-    # Fetch last 24h of historical data
+    # Fetch the last `hours` of historical data from the upstream API
+    hours = min(hours, config.VISUALIZATION_MAX_HOURS)
     end_timestamp = int(datetime.utcnow().timestamp())
-    start_timestamp = end_timestamp - 24 * 60 * 60
-    historical_data = await fetch_historical_weather_data(lat, lon, start_timestamp, end_timestamp)
+    start_timestamp = end_timestamp - hours * 60 * 60
+    historical_data = await fetch_historical_weather_data_cached(lat, lon, start_timestamp, end_timestamp, app.state.http_client)
 
     if not historical_data:
         return {"status": "error", "message": "No historical data available."}
 
     df = pd.DataFrame(historical_data)
     stats = compute_summary_statistics(df)
-    return {"status": "success", "city": city, "summary_statistics": stats}
+    return {"status": "success", "city": city or historical_data[0].get("city"), "summary_statistics": stats}
     
 
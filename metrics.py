@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal in-process metrics rendered in the Prometheus text exposition format.
+# Histograms are updated inline; the rest are read from callbacks
+# (cache stats, event-loop lag) when /metrics is scraped.
+
+# Latency buckets in seconds, from a cache hit up to a slow upstream call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels, safe to update from worker threads.
+    """
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the `with` block, including blocks that raise.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=_format_value(float(bound))))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le='+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge or counter whose samples come from `callback()`, a list of (labels dict, value), at render time.
+    """
+
+    def __init__(self, name: str, help: str, callback, metric_type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.metric_type = metric_type
+        _registry.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+def timed(histogram: Histogram, **labels):
+    """
+    Decorator observing each call of a sync or async function in `histogram`.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Application metrics
+UPSTREAM_LATENCY = Histogram(
+    "weather_upstream_request_seconds", "Latency of upstream API calls.", ("endpoint", "status")
+)
+DB_LATENCY = Histogram(
+    "weather_db_query_seconds", "Latency of EdgeDB queries.", ("query",)
+)
+MODEL_LOAD_LATENCY = Histogram(
+    "weather_model_load_seconds", "Time to load the rain model from disk."
+)
+PREDICT_LATENCY = Histogram(
+    "weather_predict_seconds", "Latency of rain predictions, cache hits included.", ("function",)
+)
+FIGURE_RENDER_LATENCY = Histogram(
+    "weather_figure_render_seconds", "Time to build and serialize dashboard figures.", ("function",)
+)
+HTTP_LATENCY = Histogram(
+    "weather_http_request_seconds", "Latency of FastAPI routes.", ("method", "route", "status")
+)
+EVENT_LOOP_LAG = Histogram(
+    "weather_event_loop_lag_seconds", "How late the event loop woke a periodic timer."
+)
+
+_caches = {}  # name -> stats() callable
+_loop_lag = {"last": 0.0, "max": 0.0}
+
+
+def track_cache(name: str, stats):
+    """
+    Export hits, misses and hit ratio of a cache whose `stats()` returns the TTLCache stats shape.
+    """
+    _caches[name] = stats
+
+
+def _cache_samples(field: str):
+    return [({"cache": name}, stats().get(field, 0)) for name, stats in sorted(_caches.items())]
+
+
+CallbackMetric("weather_cache_hits_total", "Fresh cache hits.", lambda: _cache_samples("hits"), "counter")
+CallbackMetric("weather_cache_stale_hits_total", "Cache hits served stale while refreshing.",
+               lambda: _cache_samples("stale_hits"), "counter")
+CallbackMetric("weather_cache_misses_total", "Cache misses.", lambda: _cache_samples("misses"), "counter")
+CallbackMetric("weather_cache_hit_ratio", "Share of lookups answered from the cache.",
+               lambda: _cache_samples("hit_ratio"))
+CallbackMetric("weather_cache_entries", "Entries currently cached.", lambda: _cache_samples("size"))
+CallbackMetric("weather_event_loop_lag_last_seconds", "Most recent event-loop lag sample.",
+               lambda: [({}, _loop_lag["last"])])
+CallbackMetric("weather_event_loop_lag_max_seconds", "Largest event-loop lag seen.",
+               lambda: [({}, _loop_lag["max"])])
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    Sleep for `interval` in a loop and record how much later than asked the loop woke up.
+    Anything blocking the loop (sync I/O, CPU-heavy handlers) shows up as lag.
+    """
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+        _loop_lag["last"] = lag
+        _loop_lag["max"] = max(_loop_lag["max"], lag)
+        EVENT_LOOP_LAG.observe(lag)
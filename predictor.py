@@ -1,32 +1,105 @@
+import logging
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import joblib
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+import config
+import metrics
+from compiled_forest import CompiledForest, compile_model, publish_file
+
+logger = logging.getLogger(__name__)
 
 # Path to save/load model
 MODEL_PATH = "rain_model.pkl"
 
+# Flat-array version of the model, written next to MODEL_PATH when COMPILED_MODEL_ENABLED is set
+COMPILED_MODEL_PATH = os.path.splitext(MODEL_PATH)[0] + ".npz"
+
 # List of features used for training and prediction
 FEATURE_COLUMNS = [
     "temperature", "feels_like", "temp_min", "temp_max",
     "pressure", "humidity", "wind_speed", "wind_deg"
 ]
 
+# In-process model registry: (file stamp, model) for the currently loaded model.
+# The tuple is swapped as a whole so readers never see a half-updated entry.
+_loaded_model = (None, None)
+_reload_lock = threading.Lock()
+
+class PredictionCache:
+    """
+    Thread-safe bounded LRU of rain probabilities keyed by
+    (model version, quantized feature vector).
+    """
+
+    def __init__(self, maxsize: int = 4096, decimals: int = 2):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, weather_features: dict) -> tuple:
+        return tuple(round(float(weather_features[f]), self.decimals) for f in FEATURE_COLUMNS)
+
+    def get(self, key):
+        with self._lock:
+            probability = self._entries.get(key)
+            if probability is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return probability
+
+    def set(self, key, probability):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = probability
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+prediction_cache = PredictionCache(config.PREDICTION_CACHE_MAXSIZE, config.PREDICTION_CACHE_DECIMALS)
+
 def train_model(data: pd.DataFrame):
     """
     Train a machine learning model to predict rainfall.
-    Saves the trained model to disk.
+    Saves the trained model to disk and returns the evaluation metrics.
+    The model is written to a temp file and renamed over MODEL_PATH, so
+    readers only ever see a complete file.
     """
     if 'rainfall' not in data.columns:
         raise ValueError("Data must contain 'rainfall' column for training.")
 
+    # scikit-learn is only needed here and for pickled models, not to serve compiled predictions
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report
+    import joblib
+
     # Binary classification: 1 if rainfall > 0, else 0
     data["rainfall_label"] = (data["rainfall"] > 0).astype(int)
 
-    X = data[FEATURE_COLUMNS]
-    y = data["rainfall_label"]
+    # Fit on a plain array in FEATURE_COLUMNS order, the same layout predictions are scored with
+    X = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = data["rainfall_label"].to_numpy()
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
@@ -34,34 +107,188 @@ def train_model(data: pd.DataFrame):
     model.fit(X_train, y_train)
 
     y_pred = model.predict(X_test)
-    print("Classification Report:\n", classification_report(y_test, y_pred))
+    logger.debug("Classification report:\n%s", classification_report(y_test, y_pred, zero_division=0))
 
-    # Save model
-    joblib.dump(model, MODEL_PATH)
-    print(f"[INFO] Model saved to {MODEL_PATH}")
+    # Save model atomically: write next to MODEL_PATH, then rename over it
+    model_dir = os.path.dirname(os.path.abspath(MODEL_PATH))
+    fd, tmp_path = tempfile.mkstemp(dir=model_dir, prefix=".rain_model.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(model, f)
+        if config.COMPILED_MODEL_ENABLED:
+            # Compile before publishing the pickle so the registry finds a matching
+            # compiled model as soon as the new file appears (rename keeps mtime/size)
+            stat = os.stat(tmp_path)
+            try:
+                compile_model(model, COMPILED_MODEL_PATH, X_check=X, source_stamp=(stat.st_mtime_ns, stat.st_size))
+            except ValueError as e:
+                logger.warning("Model compilation skipped: %s", e)
+        publish_file(tmp_path, MODEL_PATH)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    logger.info("Model saved to %s", MODEL_PATH)
 
+    return {
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "classification_report": classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+    }
 
-def predict_rain(weather_features: dict) -> float:
+
+def _model_stamp():
     """
-    Predict the probability of rain based on current weather features.
-    Returns the rain probability between 0 and 1.
+    Return a version stamp (mtime, size) for the model file on disk.
     """
-    if not os.path.exists(MODEL_PATH):
+    try:
+        stat = os.stat(MODEL_PATH)
+    except FileNotFoundError:
         raise ValueError("Model not trained yet. Run train_model first.")
+    return (stat.st_mtime_ns, stat.st_size)
 
-    model = joblib.load(MODEL_PATH)
 
-    # Ensure all required features are present
+@metrics.timed(metrics.MODEL_LOAD_LATENCY)
+def _load_model_file(stamp):
+    # Prefer the compiled model when it was built from this exact pickle
+    if config.COMPILED_MODEL_ENABLED and os.path.exists(COMPILED_MODEL_PATH):
+        try:
+            compiled = CompiledForest.load(COMPILED_MODEL_PATH)
+            if compiled.source_stamp == stamp:
+                return compiled
+        except Exception as e:
+            logger.warning("Could not load compiled model, using %s: %s", MODEL_PATH, e)
+    import joblib
+    return joblib.load(MODEL_PATH)
+
+
+def get_model():
+    """
+    Return the in-memory model, loading it once and reloading it when
+    train_model writes a new file. While a reload is in progress other
+    callers keep using the previous model instead of waiting for it.
+    """
+    global _loaded_model
+
+    stamp = _model_stamp()
+    loaded_stamp, model = _loaded_model
+    if loaded_stamp == stamp:
+        return model
+
+    if not _reload_lock.acquire(blocking=model is None):
+        return model
+    try:
+        loaded_stamp, model = _loaded_model
+        if loaded_stamp != stamp:
+            try:
+                model = _load_model_file(stamp)
+            except Exception as e:
+                # The file may still be being written; keep serving the old model.
+                if model is None:
+                    raise
+                logger.warning("Could not reload model, keeping previous one: %s", e)
+                return model
+            _loaded_model = (stamp, model)
+            logger.info("Loaded %s model from %s", type(model).__name__, MODEL_PATH)
+        return model
+    finally:
+        _reload_lock.release()
+
+
+def get_model_version():
+    """
+    Return the version stamp of the model currently held in memory.
+    """
+    return _loaded_model[0]
+
+
+def _get_versioned_model():
+    # Pair the model with the stamp it was loaded under; None when a reload raced us
+    model = get_model()
+    stamp, loaded = _loaded_model
+    return (stamp if loaded is model else None), model
+
+
+def _check_features(weather_features: dict, where: str = ""):
     missing = [f for f in FEATURE_COLUMNS if f not in weather_features]
     if missing:
-        raise ValueError(f"Missing features for prediction: {missing}")
+        raise ValueError(f"Missing features for prediction{where}: {missing}")
+
+
+def prediction_cache_stats() -> dict:
+    return prediction_cache.stats()
+
+
+@metrics.timed(metrics.PREDICT_LATENCY, function="predict_rain")
+def predict_rain(weather_features: dict) -> float:
+    """
+    Predict the probability of rain based on current weather features.
+    Returns the rain probability between 0 and 1.
+    Features are quantized to PREDICTION_CACHE_DECIMALS and repeated vectors
+    are answered from the prediction cache.
+    """
+    version, model = _get_versioned_model()
+
+    # Ensure all required features are present
+    _check_features(weather_features)
+
+    # Prepare input for prediction, one row in FEATURE_COLUMNS order
+    features = prediction_cache.quantize(weather_features)
+    key = (version, features)
+    if version is not None:
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            return cached
+
+    input_data = np.array([features], dtype=np.float64)
+    probability = round(float(model.predict_proba(input_data)[0][1]), 4)  # Probability of rain
+    if version is not None:
+        prediction_cache.set(key, probability)
+    return probability
+
+
+@metrics.timed(metrics.PREDICT_LATENCY, function="predict_rain_matrix")
+def predict_rain_matrix(X: np.ndarray) -> np.ndarray:
+    """
+    Score a prepared feature matrix (columns in FEATURE_COLUMNS order) with a
+    single predict_proba call, bypassing the prediction cache.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"Expected a (rows, {len(FEATURE_COLUMNS)}) feature matrix, got {X.shape}")
+    if len(X) == 0:
+        return np.empty(0)
+    return np.round(get_model().predict_proba(X)[:, 1], 4)  # Probability of rain
+
+
+@metrics.timed(metrics.PREDICT_LATENCY, function="predict_rain_batch")
+def predict_rain_batch(weather_features_list: list) -> list:
+    """
+    Predict rain probabilities for many observations at once.
+    Cached vectors are answered from the prediction cache; the rest are
+    scored as one feature matrix in FEATURE_COLUMNS order with a single
+    predict_proba call. Returns probabilities in input order.
+    """
+    if not weather_features_list:
+        return []
+
+    version, model = _get_versioned_model()
+
+    for i, weather_features in enumerate(weather_features_list):
+        _check_features(weather_features, f" at index {i}")
 
-    # Prepare input for prediction
-    input_data = pd.DataFrame([{
-        feature: weather_features[feature] for feature in FEATURE_COLUMNS
-    }])
+    keys = [(version, prediction_cache.quantize(wf)) for wf in weather_features_list]
+    results = [prediction_cache.get(key) if version is not None else None for key in keys]
 
-    probability = model.predict_proba(input_data)[0][1]  # Probability of rain
-    return round(probability, 4)
+    # Score each distinct uncached vector once
+    pending = list(dict.fromkeys(key for key, result in zip(keys, results) if result is None))
+    if pending:
+        X = np.array([features for _, features in pending], dtype=np.float64)
+        probabilities = np.round(model.predict_proba(X)[:, 1], 4).tolist()  # Probability of rain
+        scored = dict(zip(pending, probabilities))
+        if version is not None:
+            for key, probability in scored.items():
+                prediction_cache.set(key, probability)
+        results = [scored[key] if result is None else result for key, result in zip(keys, results)]
+    return results
 
   
\ No newline at end of file
@@ -0,0 +1,188 @@
+import logging
+import time
+import numpy as np
+import config
+from db import add_ingest_listener, fetch_observations_since, to_utc_datetime
+
+logger = logging.getLogger(__name__)
+
+# Recent observations per city in fixed-size NumPy ring buffers, filled as rows
+# are ingested and reloaded from EdgeDB at startup. Readers get contiguous,
+# zero-copy views, so the dashboard and summary statistics need neither an
+# upstream history call nor a list-of-dicts to DataFrame conversion.
+
+# Values are as stored: Celsius temperatures, rain chance as a 0-1 fraction; missing values are NaN
+VALUE_FIELDS = ("temperature", "humidity", "wind_speed", "rainfall", "predicted_rain_chance")
+RECENT_DTYPE = np.dtype([("timestamp", "datetime64[us]")] + [(name, np.float64) for name in VALUE_FIELDS])
+
+
+def _to_datetime64(ts) -> np.datetime64:
+    return np.datetime64(to_utc_datetime(ts).replace(tzinfo=None), "us")
+
+
+def _number(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+class CityRing:
+    """
+    Last `capacity` observations of one city, oldest first.
+
+    Every row is written twice, at i and i + capacity, so the newest rows are
+    always one contiguous slice and view() never has to copy. Appends and
+    re-ingesting stored timestamps write in place; a chunk with rows older than
+    the newest one (e.g. from a backfill) is merged in one sort, which
+    rewrites the buffer but is rare.
+    """
+
+    __slots__ = ("capacity", "_buffer", "_next", "_count")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=RECENT_DTYPE)
+        self._next = 0  # slot of the next write, in [0, capacity)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.capacity
+
+    def view(self, since=None) -> np.ndarray:
+        """
+        Rows newer than `since` (all rows when None) as a read-only view into the buffer.
+        """
+        end = self._next + self.capacity
+        rows = self._buffer[end - self._count:end]
+        if since is not None:
+            rows = rows[np.searchsorted(rows["timestamp"], _to_datetime64(since), side="left"):]
+        rows = rows.view()
+        rows.flags.writeable = False
+        return rows
+
+    def _write(self, slots, rows):
+        self._buffer[slots] = rows
+        self._buffer[slots + self.capacity] = rows
+
+    def add(self, row):
+        """
+        Add one (timestamp, *VALUE_FIELDS) tuple; a repeated timestamp replaces the stored row.
+        """
+        self.extend(np.array([row], dtype=RECENT_DTYPE))
+
+    def extend(self, rows: np.ndarray):
+        """
+        Add a RECENT_DTYPE array sorted by timestamp. Repeated timestamps replace
+        stored rows; rows older than a full ring's oldest row are dropped.
+        """
+        if not len(rows):
+            return
+        stored = self.view()["timestamp"]
+        if self._count:
+            # Upserted observations: overwrite them in place
+            idx = np.searchsorted(stored, rows["timestamp"], side="left")
+            found = idx < self._count
+            found[found] = stored[idx[found]] == rows["timestamp"][found]
+            if found.any():
+                self._write((self._next - self._count + idx[found]) % self.capacity, rows[found])
+                rows = rows[~found]
+            if self.full:
+                rows = rows[rows["timestamp"] > stored[0]]
+            if not len(rows):
+                return
+            if rows["timestamp"][0] <= stored[-1]:
+                self._merge(rows)
+                return
+
+        rows = rows[-self.capacity:]
+        self._write((self._next + np.arange(len(rows))) % self.capacity, rows)
+        self._next = (self._next + len(rows)) % self.capacity
+        self._count = min(self._count + len(rows), self.capacity)
+
+    def _merge(self, rows):
+        # Older rows (e.g. from a backfill) land between stored ones: merge the chunk once
+        rows = np.concatenate([self.view(), rows])
+        rows = rows[np.argsort(rows["timestamp"], kind="stable")][-self.capacity:]
+        # Lay the rows out from slot 0 again, in both halves
+        self._count = len(rows)
+        self._next = self._count % self.capacity
+        self._buffer[:self._count] = rows
+        self._buffer[self.capacity:self.capacity + self._count] = rows
+
+
+_rings = {}  # city -> CityRing
+# Start of the span every ring holds completely (set by rebuild); None until then
+_covered_since = None
+
+
+def _cutoff() -> np.datetime64:
+    # Rows older than the span the store serves are never read
+    return _to_datetime64(time.time() - config.RECENT_DATA_HOURS * 3600)
+
+
+def add_observations(city: str, values_list):
+    """
+    Add observation dicts for `city` to its ring in one sorted chunk,
+    skipping anything older than RECENT_DATA_HOURS before the ring is touched.
+    """
+    cutoff = _cutoff()
+    rows = []
+    for values in values_list:
+        ts = _to_datetime64(values["timestamp"])
+        if ts >= cutoff:
+            rows.append((ts,) + tuple(_number(values.get(name)) for name in VALUE_FIELDS))
+    if not rows:
+        return
+    rows = np.array(rows, dtype=RECENT_DTYPE)
+    rows = rows[np.argsort(rows["timestamp"], kind="stable")]
+    # Within the chunk, the last row for a timestamp wins
+    rows = rows[np.append(rows["timestamp"][1:] != rows["timestamp"][:-1], True)]
+
+    ring = _rings.get(city)
+    if ring is None:
+        ring = _rings[city] = CityRing(config.RECENT_DATA_CAPACITY)
+    ring.extend(rows)
+
+
+def get_recent(city: str, since) -> np.ndarray:
+    """
+    Observations of `city` newer than `since` as a zero-copy structured array,
+    or None when the store cannot vouch for that whole span (not loaded from
+    EdgeDB yet, or the ring has already dropped rows from it).
+    """
+    if _covered_since is None or to_utc_datetime(since).timestamp() < _covered_since:
+        return None
+    ring = _rings.get(city)
+    if ring is None:
+        return np.zeros(0, dtype=RECENT_DTYPE)
+    rows = ring.view()
+    if ring.full and len(rows) and rows["timestamp"][0] > _to_datetime64(since):
+        return None
+    return ring.view(since)
+
+
+def _on_ingested(rows):
+    by_city = {}
+    for row in rows:
+        if row.get("city") and row.get("timestamp") is not None:
+            by_city.setdefault(row["city"], []).append(row)
+    for city, city_rows in by_city.items():
+        add_observations(city, city_rows)
+
+add_ingest_listener(_on_ingested)
+
+
+async def rebuild(client):
+    """
+    Reload every ring from the last RECENT_DATA_HOURS of observations stored in EdgeDB.
+    """
+    global _covered_since
+    _rings.clear()
+    _covered_since = None
+    since = time.time() - config.RECENT_DATA_HOURS * 3600
+    rows = await fetch_observations_since(client, since)
+    _on_ingested(rows)
+    _covered_since = since
+    logger.info("Recent data store loaded %d stored observations", len(rows))
@@ -0,0 +1,183 @@
+import bisect
+import logging
+import math
+import time
+from collections import deque
+import config
+from db import SUMMARY_METRICS, add_ingest_listener, fetch_observations_since, to_utc_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class RollingWindow:
+    """
+    Mean, variance, min and max of one metric over a sliding time window.
+
+    Mean/variance use Welford's update with removal; min/max use monotonic
+    deques, so appends and expiries are O(1) amortized. A point not newer than
+    the latest one (a backfill row, or an upsert of a stored timestamp) is put
+    in timestamp order, replacing any value at that timestamp, and the window's
+    aggregates are recomputed from its points; that is O(n) but rare.
+    """
+
+    __slots__ = ("length", "_entries", "_count", "_mean", "_m2", "_min", "_max")
+
+    def __init__(self, length: float):
+        self.length = length
+        self._entries = deque()  # (timestamp, value), ascending by timestamp
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = deque()  # candidates for the minimum, ascending values
+        self._max = deque()  # candidates for the maximum, descending values
+
+    def _welford_add(self, value):
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+    def _welford_remove(self, value):
+        if self._count <= 1:
+            self._count, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        delta = value - self._mean
+        self._count -= 1
+        self._mean -= delta / self._count
+        self._m2 = max(0.0, self._m2 - delta * (value - self._mean))
+
+    def _push_extremes(self, ts, value):
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((ts, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+
+    def add(self, ts: float, value: float):
+        missing = value is None or (isinstance(value, float) and math.isnan(value))
+        if self._entries and ts <= self._entries[-1][0]:
+            self._insert(ts, None if missing else float(value))
+            return
+        if missing:
+            return
+        value = float(value)
+        self._welford_add(value)
+        self._entries.append((ts, value))
+        self._push_extremes(ts, value)
+
+    def _insert(self, ts, value):
+        # Late or upserted point: place it in timestamp order, then recompute
+        entries = list(self._entries)
+        i = bisect.bisect_left(entries, ts, key=lambda entry: entry[0])
+        if i < len(entries) and entries[i][0] == ts:
+            if value is None:
+                del entries[i]
+            elif entries[i][1] != value:
+                entries[i] = (ts, value)
+            else:
+                return
+        elif value is None:
+            return
+        else:
+            entries.insert(i, (ts, value))
+
+        self._entries.clear()
+        self._min.clear()
+        self._max.clear()
+        self._count, self._mean, self._m2 = 0, 0.0, 0.0
+        for ts, value in entries:
+            self._welford_add(value)
+            self._entries.append((ts, value))
+            self._push_extremes(ts, value)
+
+    def expire(self, now: float):
+        cutoff = now - self.length
+        while self._entries and self._entries[0][0] < cutoff:
+            ts, value = self._entries.popleft()
+            self._welford_remove(value)
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+
+    def summary(self) -> dict:
+        if not self._count:
+            return None
+        return {
+            "mean": round(self._mean, 2),
+            "max": round(self._max[0][1], 2),
+            "min": round(self._min[0][1], 2),
+            # Sample variance, as pandas computes it
+            "var": round(self._m2 / (self._count - 1), 2) if self._count > 1 else None
+        }
+
+
+# (city, window seconds) -> {metric: RollingWindow}
+_windows = {}
+
+
+def _window_lengths():
+    return [hours * 3600 for hours in config.ROLLING_WINDOW_HOURS]
+
+
+def add_observation(city: str, timestamp, values: dict, now: float = None):
+    """
+    Fold one observation into every configured window for `city`.
+    Observations already older than a window are ignored for that window, and
+    expired points are dropped here too so windows nobody reads stay bounded.
+    """
+    ts = to_utc_datetime(timestamp).timestamp()
+    now = time.time() if now is None else now
+    for length in _window_lengths():
+        if ts < now - length:
+            continue
+        metrics = _windows.get((city, length))
+        if metrics is None:
+            metrics = _windows[(city, length)] = {m: RollingWindow(length) for m in SUMMARY_METRICS}
+        for metric, window in metrics.items():
+            window.expire(now)
+            window.add(ts, values.get(metric))
+
+
+def get_summary_statistics(city: str, hours: int = 24, now: float = None):
+    """
+    Return stats in the compute_summary_statistics shape for `city` over the
+    last `hours`, or None when that window is not tracked or holds no data.
+    """
+    metrics = _windows.get((city, hours * 3600))
+    if metrics is None:
+        return None
+    now = time.time() if now is None else now
+    stats = {}
+    for metric, window in metrics.items():
+        window.expire(now)
+        summary = window.summary()
+        if summary is not None:
+            stats[metric] = summary
+    return stats or None
+
+
+def _on_ingested(rows):
+    for row in rows:
+        if row.get("city") and row.get("timestamp") is not None:
+            add_observation(row["city"], row["timestamp"], row)
+
+add_ingest_listener(_on_ingested)
+
+
+async def rebuild(client):
+    """
+    Reload every window from the observations stored in EdgeDB.
+    """
+    lengths = _window_lengths()
+    if not lengths:
+        _windows.clear()
+        return
+    now = time.time()
+    rows = await fetch_observations_since(client, now - max(lengths))
+    # Rows come oldest first, so every point takes the O(1) append path
+    _windows.clear()
+    for row in rows:
+        add_observation(row["city"], row["timestamp"], row, now=now)
+    logger.info("Rolling statistics rebuilt from %d stored observations", len(rows))
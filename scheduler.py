@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import random
+import time
+import config
+from db import insert_weather_data_bulk
+from predictor import predict_rain_batch
+from weather_collector import fetch_weather_data
+
+logger = logging.getLogger(__name__)
+
+
+async def _collect_site(site, http_client, semaphore, queue, delay):
+    # Spread sites over the jitter window so the upstream sees a steady trickle, not a burst
+    await asyncio.sleep(delay)
+    async with semaphore:
+        try:
+            weather_data = await fetch_weather_data(site["lat"], site["lon"], http_client)
+        except Exception as e:
+            logger.warning("Scheduled collection failed for %s,%s: %s", site["lat"], site["lon"], e)
+            return
+    if site.get("name"):
+        weather_data["city"] = site["name"]
+    # Blocks when the writer falls behind, which in turn holds back new fetches
+    await queue.put(weather_data)
+
+
+async def _write_batch(batch, db_client):
+    try:
+        probabilities = predict_rain_batch(batch)
+    except Exception as e:
+        logger.warning("Could not predict rain for scheduled batch: %s", e)
+        probabilities = [None] * len(batch)
+    rows = [dict(weather_data, predicted_rain_chance=p) for weather_data, p in zip(batch, probabilities)]
+    reports = await insert_weather_data_bulk(rows, db_client)
+    inserted = sum(r["inserted"] for r in reports)
+    logger.info("Scheduler stored %d/%d observations", inserted, len(rows))
+
+
+async def _write_batch_shielded(batch, db_client):
+    # Rows in `batch` are already off the queue: cancelling the writer must not drop them
+    write = asyncio.ensure_future(_write_batch(batch, db_client))
+    try:
+        await asyncio.shield(write)
+    except asyncio.CancelledError:
+        await asyncio.wait({write})
+        if not write.cancelled() and write.exception() is not None:
+            logger.warning("Could not store scheduled batch while stopping: %s", write.exception())
+        raise
+
+
+async def _writer(queue, db_client, batch_size, flush_seconds):
+    """
+    Drain the queue into batches of up to `batch_size`, flushing at least every `flush_seconds`.
+    """
+    while True:
+        batch = [await queue.get()]
+        deadline = time.monotonic() + flush_seconds
+        try:
+            while len(batch) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Shutting down: write what was already taken off the queue
+            await _write_batch_shielded(batch, db_client)
+            raise
+        await _write_batch_shielded(batch, db_client)
+
+
+async def run_scheduler(sites, http_client, db_client, interval: float = None, jitter: float = None,
+                        concurrency: int = None, queue_size: int = None,
+                        batch_size: int = None, flush_seconds: float = None):
+    """
+    Poll current weather for every site each `interval` seconds until cancelled.
+
+    Each site starts at a random offset within `jitter` seconds, fetches are
+    bounded by `concurrency`, and results go through a bounded queue to a
+    single writer that upserts them to EdgeDB in batches. A site whose
+    previous fetch is still running is skipped for that round.
+    """
+    interval = interval or config.SCHEDULER_INTERVAL
+    jitter = config.SCHEDULER_JITTER if jitter is None else jitter
+    concurrency = concurrency or config.SCHEDULER_CONCURRENCY
+    queue_size = queue_size or config.SCHEDULER_QUEUE_SIZE
+    batch_size = batch_size or config.SCHEDULER_BATCH_SIZE
+    flush_seconds = flush_seconds or config.SCHEDULER_FLUSH_SECONDS
+
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue(maxsize=queue_size)
+    writer = asyncio.create_task(_writer(queue, db_client, batch_size, flush_seconds))
+    in_flight = {}  # site index -> task
+
+    logger.info("Scheduler started for %d sites every %ss", len(sites), interval)
+    try:
+        while True:
+            started = time.monotonic()
+            for index, site in enumerate(sites):
+                previous = in_flight.get(index)
+                if previous is not None and not previous.done():
+                    logger.warning("Skipping %s,%s: previous collection still running", site["lat"], site["lon"])
+                    continue
+                delay = random.uniform(0, jitter) if jitter else 0
+                in_flight[index] = asyncio.create_task(
+                    _collect_site(site, http_client, semaphore, queue, delay)
+                )
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        for task in in_flight.values():
+            task.cancel()
+        writer.cancel()
+        await asyncio.gather(writer, *in_flight.values(), return_exceptions=True)
+
+        # Flush whatever was collected but not yet written
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        if pending:
+            await _write_batch(pending, db_client)
+        logger.info("Scheduler stopped")
@@ -0,0 +1,59 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rolling_stats  # noqa: E402
+from main import compute_summary_statistics  # noqa: E402
+
+NOW = datetime(2026, 1, 2, tzinfo=timezone.utc).timestamp()
+
+
+def _expected(rows):
+    import pandas as pd
+
+    return compute_summary_statistics(pd.DataFrame([values for _, values in rows]), temperature_in_kelvin=False)
+
+
+def _stats(rows, now=NOW):
+    rolling_stats._windows.clear()
+    for hours_ago, values in rows:
+        rolling_stats.add_observation("Vancouver", NOW - hours_ago * 3600, values, now=NOW)
+    return rolling_stats.get_summary_statistics("Vancouver", 24, now=now)
+
+
+def _values(temperature, humidity, wind_speed, rainfall):
+    return {"temperature": temperature, "humidity": humidity, "wind_speed": wind_speed, "rainfall": rainfall}
+
+
+def test_out_of_order_add():
+    rows = [
+        (3, _values(5.0, 80.0, 2.0, 0.0)),
+        (1, _values(7.5, 70.0, 3.5, 1.2)),
+        # Backfilled after a newer observation
+        (2, _values(6.0, 75.0, 1.0, 0.4)),
+        (5, _values(-1.0, 90.0, 6.0, 2.0)),
+    ]
+    assert _stats(rows) == _expected(rows)
+
+
+def test_same_timestamp_upsert_replaces_value():
+    rows = [
+        (3, _values(5.0, 80.0, 2.0, 0.0)),
+        (1, _values(7.5, 70.0, 3.5, 1.2)),
+        (3, _values(9.0, 60.0, 4.0, 0.5)),
+    ]
+    # The stored row for that timestamp is the last one written
+    assert _stats(rows) == _expected(rows[1:])
+
+
+def test_expiry_matches_remaining_rows():
+    rows = [
+        (20, _values(5.0, 80.0, 2.0, 0.0)),
+        (16, _values(7.5, 70.0, 3.5, 1.2)),
+        (6, _values(6.0, 75.0, 1.0, 0.4)),
+        (2, _values(-1.0, 90.0, 6.0, 2.0)),
+    ]
+    # Ten hours later the first two rows are older than the 24 hour window
+    assert _stats(rows, now=NOW + 10 * 3600) == _expected(rows[2:])
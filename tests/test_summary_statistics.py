@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recent_data  # noqa: E402
+from main import compute_summary_statistics  # noqa: E402
+
+
+def _ring(rows):
+    ring = recent_data.CityRing(8)
+    for ts, values in rows:
+        ring.add((np.datetime64(ts, "us"),) + tuple(values.get(name, np.nan) for name in recent_data.VALUE_FIELDS))
+    return ring.view()
+
+
+def test_empty_window():
+    assert compute_summary_statistics(np.zeros(0, dtype=recent_data.RECENT_DTYPE), temperature_in_kelvin=False) == {}
+
+
+def test_single_row_is_json_compliant():
+    view = _ring([("2026-01-01T00:00", {"temperature": 5.0, "humidity": 80.0, "rainfall": 0.0})])
+    stats = compute_summary_statistics(view, temperature_in_kelvin=False)
+
+    assert stats["temperature"] == {"mean": 5.0, "max": 5.0, "min": 5.0, "var": None}
+    # wind_speed has no values at all
+    assert "wind_speed" not in stats
+    json.dumps(stats, allow_nan=False)
+
+
+def test_matches_dataframe_aggregation():
+    import pandas as pd
+
+    rows = [
+        ("2026-01-01T00:00", {"temperature": 5.0, "humidity": 80.0, "wind_speed": 2.0, "rainfall": 0.0}),
+        ("2026-01-01T01:00", {"temperature": 7.5, "humidity": 70.0, "wind_speed": 3.5, "rainfall": 1.2}),
+        ("2026-01-01T02:00", {"temperature": 6.0, "humidity": 75.0, "wind_speed": 1.0, "rainfall": 0.4}),
+    ]
+    expected = compute_summary_statistics(pd.DataFrame([values for _, values in rows]), temperature_in_kelvin=False)
+    assert compute_summary_statistics(_ring(rows), temperature_in_kelvin=False) == expected
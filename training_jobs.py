@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import config
+import predictor
+
+logger = logging.getLogger(__name__)
+
+# Most recent jobs by id; older finished jobs are dropped past TRAINING_JOB_HISTORY
+_jobs = OrderedDict()
+_executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawn rather than fork: a forked child of this threaded process (event loop,
+        # logging listener, connection pools) can inherit a held lock and hang
+        _executor = ProcessPoolExecutor(
+            max_workers=config.TRAINING_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown():
+    """
+    Stop the worker processes; called from main.lifespan on shutdown.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _trim_history():
+    while len(_jobs) > config.TRAINING_JOB_HISTORY:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if oldest["status"] in ("queued", "running"):
+            break
+        _jobs.pop(oldest_id)
+
+
+async def _run_job(job, data):
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    loop = asyncio.get_running_loop()
+    try:
+        # Fit in a worker process so the event loop keeps serving requests
+        job["metrics"] = await loop.run_in_executor(_get_executor(), predictor.train_model, data)
+        # Load the new model now rather than on the next prediction request
+        await asyncio.to_thread(predictor.get_model)
+        job["status"] = "succeeded"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        logger.warning("Training job %s failed: %s", job["id"], e)
+    finally:
+        job["finished_at"] = time.time()
+
+
+def submit_training_job(data) -> str:
+    """
+    Queue a training run on `data` (a DataFrame) and return its job id right away.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "rows": len(data),
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "metrics": None,
+        "error": None
+    }
+    _jobs[job_id] = job
+    _trim_history()
+    job["task"] = asyncio.create_task(_run_job(job, data))
+    return job_id
+
+
+def get_job(job_id: str):
+    """
+    Return the public view of a job, or None if it is unknown.
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    return {key: value for key, value in job.items() if key != "task"}
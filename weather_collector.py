@@ -1,20 +1,89 @@
 import os
 os.environ.pop("SSL_CERT_FILE", None)
 import asyncio
+import importlib.util
+import logging
+import time
 import httpx
+from contextlib import asynccontextmanager
 from datetime import datetime
+import config
+import metrics
+from cache import TTLCache, grid_key, time_bucket
+from logging_config import log_payload
 
 API_KEY = ""
-    
-async def fetch_weather_data(lat: float, lon: float):
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units=metric"
-    async with httpx.AsyncClient(verify=False) as client:
+
+logger = logging.getLogger(__name__)
+
+# Short-lived caches for upstream responses, keyed by grid cell (and time bucket for history)
+weather_cache = TTLCache(
+    maxsize=config.CACHE_MAXSIZE,
+    ttl=config.WEATHER_CACHE_TTL,
+    stale_ttl=config.WEATHER_CACHE_STALE_TTL,
+    name="weather"
+)
+history_cache = TTLCache(
+    maxsize=config.CACHE_MAXSIZE,
+    ttl=config.HISTORY_CACHE_TTL,
+    stale_ttl=config.HISTORY_CACHE_STALE_TTL,
+    name="history"
+)
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client shared by all upstream calls.
+    Keeps connections alive between requests so each call skips the TCP/TLS handshake.
+    """
+    http2 = config.HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        verify=config.HTTP_VERIFY_SSL,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)
+    )
+
+@asynccontextmanager
+async def _use_client(client: httpx.AsyncClient = None):
+    # Use the shared client when given, otherwise a short-lived one (e.g. from notebooks)
+    if client is not None:
+        yield client
+    else:
+        async with httpx.AsyncClient(verify=False) as temp_client:
+            yield temp_client
+
+async def timed_get(client: httpx.AsyncClient, url: str, endpoint: str) -> httpx.Response:
+    """
+    GET `url` and record its latency under `endpoint` with the response status (or "error").
+    """
+    started = time.perf_counter()
+    status = "error"
+    try:
         response = await client.get(url)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+
+async def fetch_weather_data(lat: float, lon: float, client: httpx.AsyncClient = None):
+    url = f"{config.OWM_BASE_URL}/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units=metric"
+    async with _use_client(client) as client:
+        response = await timed_get(client, url, "weather")
         data = response.json()
 
         # Extract relevant data from the API response
         weather_data = {
-            "timestamp": datetime.utcnow().isoformat(),  # Current timestamp in UTC
+            # Hour of the upstream observation (UTC): repeated collections within
+            # an hour upsert one row per city, like hourly history rows
+            "timestamp": get_timestamp(data).replace(minute=0, second=0, microsecond=0).isoformat(),
             "temperature": data["main"]["temp"],  # Current temperature
             "feels_like": data["main"]["feels_like"],  # "Feels like" temperature
             "temp_min": data["main"]["temp_min"],  # Minimum temperature
@@ -31,7 +100,7 @@ async def fetch_weather_data(lat: float, lon: float):
             "longitude": lon  # Longitude of the location
             
         }
-        print(weather_data)  # Debugging step
+        log_payload(logger, "Current weather", weather_data)
         return weather_data
 
 # This function returns a timestamp from the API data
@@ -40,18 +109,22 @@ def get_timestamp(raw_data: dict):
 
 
 # Function to fetch historical weather data
-async def fetch_historical_weather_data(lat: float, lon: float, start_timestamp: int, end_timestamp: int):
-    url = f"https://history.openweathermap.org/data/2.5/history/city?lat={lat}&lon={lon}&type=hour&start={start_timestamp}&end={end_timestamp}&appid={API_KEY}"
+async def fetch_historical_weather_data(lat: float, lon: float, start_timestamp: int, end_timestamp: int, client: httpx.AsyncClient = None, city_name: str = None):
+    url = f"{config.OWM_HISTORY_BASE_URL}/data/2.5/history/city?lat={lat}&lon={lon}&type=hour&start={start_timestamp}&end={end_timestamp}&appid={API_KEY}"
     
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(url)
+    async with _use_client(client) as client:
+        if city_name is None:
+            # The city name lookup does not depend on the history response, so run both at once
+            response, city_name = await asyncio.gather(
+                timed_get(client, url, "history"),
+                get_city_name_by_coordinates(lat, lon, client)
+            )
+        else:
+            response = await timed_get(client, url, "history")
         data = response.json()
 
         # Extract city_id from the response
         city_id = data["city_id"]
-        
-        # Fetch current weather data using the city_id to get the city name
-        city_name = await get_city_name_by_coordinates(lat, lon)
 
         # Extract weather data from the response
         historical_weather_data = []
@@ -76,18 +149,75 @@ async def fetch_historical_weather_data(lat: float, lon: float, start_timestamp:
 
         return historical_weather_data
 
+# Function to fetch the 5-day / 3-hour forecast feed
+async def fetch_forecast_data(lat: float, lon: float, client: httpx.AsyncClient = None):
+    url = f"{config.OWM_BASE_URL}/data/2.5/forecast?lat={lat}&lon={lon}&appid={API_KEY}&units=metric"
+    async with _use_client(client) as client:
+        response = await timed_get(client, url, "forecast")
+        data = response.json()
+
+        # Error payloads carry no "list"; raise so they are not cached as an empty forecast
+        if "list" not in data:
+            raise ValueError(f"Forecast not available for coordinates ({lat}, {lon}). Response: {data}")
+
+        city_name = data.get("city", {}).get("name")
+
+        # Normalize every horizon to the same fields as fetch_weather_data
+        forecast_entries = []
+        for entry in data.get("list", []):
+            forecast_entries.append({
+                "timestamp": datetime.utcfromtimestamp(entry["dt"]).isoformat(),
+                "temperature": entry["main"]["temp"],
+                "feels_like": entry["main"]["feels_like"],
+                "temp_min": entry["main"]["temp_min"],
+                "temp_max": entry["main"]["temp_max"],
+                "pressure": entry["main"]["pressure"],
+                "humidity": entry["main"]["humidity"],
+                "wind_speed": entry["wind"]["speed"],
+                "wind_deg": entry["wind"]["deg"],
+                "cloud_coverage": entry.get("clouds", {}).get("all"),
+                "rainfall": entry.get("rain", {}).get("3h", 0.0),  # Rainfall (3 hours)
+                "precipitation_probability": entry.get("pop"),  # Upstream's own estimate
+                "city": city_name,
+                "latitude": lat,
+                "longitude": lon
+            })
+
+        return forecast_entries
+
+# Cached variants: callers get their own copies since handlers modify the records in place
+async def fetch_weather_data_cached(lat: float, lon: float, client: httpx.AsyncClient = None):
+    cell_lat, cell_lon = grid_key(lat, lon, config.CACHE_GRID_DECIMALS)
+    weather_data = await weather_cache.get_or_fetch(
+        (cell_lat, cell_lon),
+        lambda: fetch_weather_data(cell_lat, cell_lon, client)
+    )
+    return dict(weather_data)
+
+async def fetch_historical_weather_data_cached(lat: float, lon: float, start_timestamp: int, end_timestamp: int, client: httpx.AsyncClient = None):
+    cell_lat, cell_lon = grid_key(lat, lon, config.CACHE_GRID_DECIMALS)
+    key = (
+        cell_lat, cell_lon,
+        time_bucket(start_timestamp, config.HISTORY_CACHE_BUCKET),
+        time_bucket(end_timestamp, config.HISTORY_CACHE_BUCKET)
+    )
+    historical_weather_data = await history_cache.get_or_fetch(
+        key,
+        lambda: fetch_historical_weather_data(cell_lat, cell_lon, start_timestamp, end_timestamp, client)
+    )
+    return [dict(entry) for entry in historical_weather_data]
+
 # Function to get the city name by latitude and longitude (instead of city_id)
-async def get_city_name_by_coordinates(lat: float, lon: float):
-    print(f"Fetching weather data for coordinates: {lat}, {lon}")  # Print the coordinates to check
+async def get_city_name_by_coordinates(lat: float, lon: float, client: httpx.AsyncClient = None):
+    logger.debug("Looking up city name for coordinates: %s, %s", lat, lon)
 
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}"
+    url = f"{config.OWM_BASE_URL}/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}"
 
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(url)
+    async with _use_client(client) as client:
+        response = await timed_get(client, url, "city_name")
         data = response.json()
 
-        # Debugging step: print the entire response to check for the structure
-        print("Response from OpenWeatherMap API:", data)
+        log_payload(logger, "City name lookup response", data)
 
         # Check if the response contains the 'name' key
         if "name" in data: